@@ -4,6 +4,11 @@ from flask import Flask, request, jsonify, Response
 import requests
 import os
 
+try:
+    import orjson
+except ImportError:
+    orjson = None  # Optional: falls back to Flask's jsonify
+
 # ==============================================================================
 # GLOBAL CONFIGURATION
 # ==============================================================================
@@ -202,6 +207,10 @@ def search_local():
                 "manifest": m # Include full manifest for Read Repair
             })
             
+    # search_local answers every broadcast: orjson serializes the (possibly large)
+    # manifest list much faster than the stdlib encoder behind jsonify
+    if orjson is not None:
+        return Response(orjson.dumps({"results": matches}), mimetype="application/json")
     return jsonify({"results": matches})
 
 # --- Topology Management (Join/Leave/Gossip) ---
@@ -353,8 +362,7 @@ def check_existence():
 
     # Check Chunk existence
     for c_hash in chunks_to_check:
-        expected_path = os.path.join(peer_instance.storage.data_dir, c_hash)
-        if not os.path.exists(expected_path):
+        if not peer_instance.storage.has_chunk(c_hash):
             missing_c.append(c_hash)
             
     return jsonify({
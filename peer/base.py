@@ -31,6 +31,10 @@ class BasePeer:
         self.last_seen = {p: time.time() for p in self.known_peers}
         self.bootstrap_peers = list(known_peers)  # Snapshot iniziale per rejoin
 
+        # Circuit breaker per endpoint: addr -> {"fails": n, "open_until": ts}
+        self._peer_health = {}
+        self._health_lock = threading.Lock()
+
     # ==========================================
     # METODI ASTRATTI (Da implementare nei figli)
     # ==========================================
@@ -105,7 +109,7 @@ class BasePeer:
             peers = chunk_info.get("peers", [])
             
             # Se ce l'ho già, salto
-            if self.storage.load_chunk(ch_hash):
+            if self.storage.has_chunk(ch_hash):
                 fetched.append(ch_hash)
                 continue
 
@@ -236,6 +240,22 @@ class BasePeer:
         # Qui potresti forzare una sincronizzazione più aggressiva se necessario
         pass
 
+    def _circuit_open(self, endpoint):
+        """True se l'endpoint ha fallito di recente: si salta la richiesta fino a fine backoff"""
+        with self._health_lock:
+            h = self._peer_health.get(endpoint)
+            return h is not None and h["open_until"] > time.time()
+
+    def _record_result(self, endpoint, ok):
+        """Aggiorna il circuit breaker: backoff esponenziale (max 30s) sui fallimenti, reset al successo"""
+        with self._health_lock:
+            if ok:
+                self._peer_health.pop(endpoint, None)
+                return
+            h = self._peer_health.setdefault(endpoint, {"fails": 0, "open_until": 0})
+            h["fails"] += 1
+            h["open_until"] = time.time() + min(30, 2 ** h["fails"])
+
     def _merge_peers(self, new_peers):
         """Helper thread-safe per aggiungere nuovi peer"""
         with self.lock:
@@ -1,5 +1,15 @@
 import hashlib
 import bisect
+from functools import lru_cache
+
+@lru_cache(maxsize=4096)
+def placement_hash(key):
+    """
+    SHA-1 (hex) of a placement key (e.g. the genre in SemanticPeer).
+    Must match the hash used by healing (NaivePeer._repair_manifests).
+    Keys come from a small vocabulary, so the digest is memoized.
+    """
+    return hashlib.sha1(key.encode()).hexdigest()
 
 class ConsistentHashRing:
     def __init__(self, nodes=None, replicas=100):
@@ -18,6 +18,17 @@ class NaivePeer(BasePeer):
       Does not use distributed indices.
     """
 
+    def __init__(self, *args, session=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # HTTP session for every peer-to-peer call of this class (search, chunk and
+        # manifest sends): pooled keep-alive connections to the neighbours are
+        # reused across requests and threads (injectable, e.g. in tests)
+        if session is None:
+            session = requests.Session()
+            session.mount("http://", requests.adapters.HTTPAdapter(
+                pool_connections=64, pool_maxsize=64, max_retries=0, pool_block=False))
+        self.session = session
+
     def upload_file(self, filepath, metadata=None, simulate_content=False):
         """
         Uploads a file to the network:
@@ -117,7 +128,7 @@ class NaivePeer(BasePeer):
                 # Call neighbor's specific local search endpoint
                 # (See api.py: /search_local)
                 url = f"http://{peer_addr}/search_local"
-                r = requests.get(url, params=query, timeout=2) # Low timeout to avoid blocking
+                r = self.session.get(url, params=query, timeout=2) # Low timeout to avoid blocking
                 
                 if r.status_code == 200:
                     remote_data = r.json().get("results", [])
@@ -229,7 +240,7 @@ class NaivePeer(BasePeer):
         """Helper to send a chunk via HTTP"""
         try:
             url = f"http://{target}/store_chunk"
-            requests.post(url, files={"chunk": data}, timeout=5)
+            self.session.post(url, files={"chunk": data}, timeout=5)
         except Exception as e:
             print(f"Error sending chunk {ch_hash} to {target}: {e}")
 
@@ -237,7 +248,7 @@ class NaivePeer(BasePeer):
         """Helper to send a manifest via HTTP"""
         try:
             url = f"http://{target}/store_manifest"
-            requests.post(url, json=manifest, timeout=3)
+            self.session.post(url, json=manifest, timeout=3)
             print(f"[Peer:{self.self_id}] Manifest replicated on {target}")
         except Exception as e:
             print(f"Error sending manifest to {target}: {e}")
@@ -326,7 +337,7 @@ class NaivePeer(BasePeer):
             # Ask only for manifest for now (light check)
             payload = {"manifests": [manifest_hash], "chunks": []}
             
-            r = requests.post(
+            r = self.session.post(
                 f"http://{target_peer}/check_existence", 
                 json=payload, 
                 timeout=2
@@ -1,13 +1,76 @@
-﻿import subprocess
-import shutil
-from time import sleep
+﻿import os
+import sys
 import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox
 import json
+import threading
+import queue
+import time
 from pathlib import Path
 from collections import defaultdict
-import requests
 import string
+import re
+
+try:
+    import orjson
+    _json_loads = orjson.loads  # bytes in, no intermediate str decoding
+except ImportError:
+    _json_loads = json.loads
+
+# requests, subprocess, shutil and the docker SDK are imported where they are
+# used: the window opens without paying for urllib3/certifi/charset_normalizer
+
+# Image and network created by docker-compose for the peer cluster
+PEER_IMAGE = "eldenringtorrent--peer1"
+PEER_NETWORK = "eldenringtorrent-_p2p_net"
+PEER_KNOWN_PEERS = "peer1:5000,peer2:5000,peer3:5000,peer4:5000,peer5:5000,peer6:5000,peer7:5000"
+
+# Peer data folders are named data_peer<N>; peer N listens on host port 5000 + N
+_PEER_NUM = re.compile(r'data_peer(\d+)$')
+
+
+def _iter_peer_files(peer_dir):
+    """
+    Yields the file entries of a peer data folder. Chunks are stored in
+    2-character shard subfolders (data_peerN/ab/ab12...), so those are
+    walked too; their entries come out as if they were at the top level.
+    """
+    with os.scandir(peer_dir) as entries:
+        for entry in entries:
+            if len(entry.name) == 2 and entry.is_dir():
+                with os.scandir(entry.path) as shard:
+                    for chunk in shard:
+                        if chunk.is_file():
+                            yield chunk
+            elif entry.is_file():
+                yield entry
+
+
+def _fast_copy(src, dst):
+    """
+    Copies a file keeping the data inside the kernel: copy_file_range on
+    Linux (a reflink clone on CoW filesystems), shutil.copyfile elsewhere
+    (sendfile / platform fast-copy). Metadata is copied like copy2.
+    """
+    import shutil
+    copy_range = getattr(os, "copy_file_range", None)
+    if copy_range is not None:
+        try:
+            with open(src, "rb") as fin, open(dst, "wb") as fout:
+                remaining = os.fstat(fin.fileno()).st_size
+                while remaining > 0:
+                    copied = copy_range(fin.fileno(), fout.fileno(), remaining)
+                    if copied == 0:
+                        break
+                    remaining -= copied
+            if remaining == 0:
+                shutil.copystat(src, dst)
+                return
+        except OSError:
+            pass
+    shutil.copyfile(src, dst)
+    shutil.copystat(src, dst)
+
 
 class PeerMonitorGUI:
     # Modern color themes
@@ -44,22 +107,100 @@ class PeerMonitorGUI:
         }
     }
     
+    # Fonts are theme independent: built once, shared by every style/tag
+    FONT_TITLE = ('Segoe UI', 24, 'bold')
+    FONT_SUBTITLE = ('Segoe UI', 11)
+    FONT_BOLD = ('Segoe UI', 10, 'bold')
+    FONT_CARD = ('Segoe UI', 12, 'bold')
+    
+    # Container lists are reused for this long (seconds) between docker queries
+    DOCKER_CACHE_TTL = 2.0
+
+    # Button styles: name -> (color key, hover color key)
+    BUTTON_STYLES = [
+        ('Modern', 'accent', 'accent_hover'),
+        ('Success', 'success', 'success_hover'),
+        ('Warning', 'warning', 'warning_hover'),
+        ('Danger', 'error', 'error_hover'),
+        ('Info', 'info', 'info_hover'),
+        ('Purple', 'purple', 'purple_hover'),
+        ('Cyan', 'cyan', 'cyan_hover'),
+        ('Teal', 'teal', 'teal_hover'),
+        ('Indigo', 'indigo', 'indigo_hover'),
+        ('Pink', 'pink', 'pink_hover'),
+        ('Secondary', 'secondary', 'secondary_hover')
+    ]
+    _BUTTON_STYLE_CACHE = {}
+
+    # Details text tags: tag -> (color key, font)
+    TEXT_TAGS = {
+        'header': ('accent', ('Consolas', 12, 'bold')),
+        'section': ('text', ('Consolas', 10, 'bold')),
+        'key': ('accent', ('Consolas', 9, 'bold')),
+        'value': ('text', ('Consolas', 9, '')),
+        'success': ('success', ('Consolas', 9, '')),
+        'warning': ('warning', ('Consolas', 9, '')),
+        'error': ('error', ('Consolas', 9, ''))
+    }
+    
     def __init__(self, root):
         self.root = root
         self.root.title("🌐 EldenRing Torrent - P2P Network")
         self.root.geometry("1400x850")
         self.root.state('zoomed')
-        self.base_dir = Path(__file__).parent.parent
+        # Resolved once: every data_peer* path derived from it is already absolute
+        self.base_dir = Path(__file__).resolve().parent.parent
         self.dark_mode = True
         self.colors = self.THEMES['dark']
+        self._peer_order = []
+        self._peer_rows = None
+        self._session = None
+        self._styles_theme = None
+        self._dc = self._connect_docker()
+        self._docker_cache = {}
+        self._runtime_warned = False
+        self._peer_image, self._peer_network = self._resolve_peer_runtime()
+        # (callback, args) posted by worker threads; only the Tk thread touches widgets
+        self._ui_queue = queue.Queue()
         
         self.root.configure(bg=self.colors['bg'])
         self.setup_styles()
         self.create_widgets()
         self.refresh_data()
+        self.root.after(50, self._drain_ui_queue)
         
+    @property
+    def _http(self):
+        """Shared HTTP session (keep-alive), created on first request"""
+        if self._session is None:
+            import requests
+            self._session = requests.Session()
+        return self._session
+
+    @classmethod
+    def _button_styles(cls, theme):
+        """(style name, configure options, map options) per button, built once per theme"""
+        if theme not in cls._BUTTON_STYLE_CACHE:
+            c = cls.THEMES[theme]
+            cls._BUTTON_STYLE_CACHE[theme] = [
+                (f'{btn_type}.TButton',
+                 {'font': cls.FONT_BOLD, 'foreground': 'white', 'background': c[color_key],
+                  'borderwidth': 0, 'focuscolor': c['bg2'], 'padding': (15, 8)},
+                 # Dynamic map for hover and active
+                 {'background': [('active', c[hover_key]), ('pressed', c[color_key])],
+                  'foreground': [('active', 'white'), ('pressed', 'white')]})
+                for btn_type, color_key, hover_key in cls.BUTTON_STYLES
+            ]
+        return cls._BUTTON_STYLE_CACHE[theme]
+
     def setup_styles(self):
         """Configures modern and minimalist styles with hover effects"""
+        # ttk styles are global: nothing to do if this palette is already applied
+        theme = 'dark' if self.dark_mode else 'light'
+        if self._styles_theme == theme:
+            return
+        self._styles_theme = theme
+        
         style = ttk.Style()
         style.theme_use('clam')
         c = self.colors
@@ -68,46 +209,22 @@ class PeerMonitorGUI:
         for name in ['Main', 'Card', 'Header']:
             style.configure(f'{name}.TFrame', background=c['bg2'] if name != 'Main' else c['bg'])
         
-        style.configure('Title.TLabel', font=('Segoe UI', 24, 'bold'), 
+        style.configure('Title.TLabel', font=self.FONT_TITLE, 
                        foreground=c['text'], background=c['bg2'])
-        style.configure('Subtitle.TLabel', font=('Segoe UI', 11), 
+        style.configure('Subtitle.TLabel', font=self.FONT_SUBTITLE, 
                        foreground=c['text2'], background=c['bg2'])
-        style.configure('Status.TLabel', font=('Segoe UI', 10, 'bold'), 
+        style.configure('Status.TLabel', font=self.FONT_BOLD, 
                        foreground=c['success'], background=c['bg2'])
         
-        # Map button styles for hover
-        btn_styles = [
-            ('Modern', 'accent', 'accent_hover'),
-            ('Success', 'success', 'success_hover'), 
-            ('Warning', 'warning', 'warning_hover'),
-            ('Danger', 'error', 'error_hover'),
-            ('Info', 'info', 'info_hover'),
-            ('Purple', 'purple', 'purple_hover'),
-            ('Cyan', 'cyan', 'cyan_hover'),
-            ('Teal', 'teal', 'teal_hover'),
-            ('Indigo', 'indigo', 'indigo_hover'),
-            ('Pink', 'pink', 'pink_hover'),
-            ('Secondary', 'secondary', 'secondary_hover')
-        ]
-
-        for btn_type, color_key, hover_key in btn_styles:
-            style.configure(f'{btn_type}.TButton', 
-                          font=('Segoe UI', 10, 'bold'),
-                          foreground='white', 
-                          background=c[color_key], 
-                          borderwidth=0,
-                          focuscolor=c['bg2'],
-                          padding=(15, 8))
-            
-            # Dynamic map for hover and active
-            style.map(f'{btn_type}.TButton',
-                     background=[('active', c[hover_key]), ('pressed', c[color_key])],
-                     foreground=[('active', 'white'), ('pressed', 'white')])
+        # Button styles with hover (options precomputed per theme)
+        for name, config, state_map in self._button_styles(theme):
+            style.configure(name, **config)
+            style.map(name, **state_map)
         
         # Modern LabelFrame
         style.configure('Card.TLabelframe', background=c['bg2'], foreground=c['text'], 
                        borderwidth=1, relief='solid')
-        style.configure('Card.TLabelframe.Label', font=('Segoe UI', 12, 'bold'),
+        style.configure('Card.TLabelframe.Label', font=self.FONT_CARD,
                        foreground=c['text'], background=c['bg2'])
         
     def create_widgets(self):
@@ -187,20 +304,7 @@ class PeerMonitorGUI:
                                                       padx=10, pady=10)
         self.details_text.pack(fill=tk.BOTH, expand=True)
         
-        # Text formatting tags
-        tags = {
-            'header': (c['accent'], 'bold', 12),
-            'section': (c['text'], 'bold', 10),
-            'key': (c['accent'], 'bold', 9),
-            'value': (c['text'], 'normal', 9),
-            'success': (c['success'], 'normal', 9),
-            'warning': (c['warning'], 'normal', 9),
-            'error': (c['error'], 'normal', 9)
-        }
-        
-        for tag, (fg, weight, size) in tags.items():
-            self.details_text.tag_config(tag, foreground=fg, 
-                                        font=('Consolas', size, weight if weight == 'bold' else ''))
+        self.setup_text_tags()
         
         # Responsive grid configuration
         self.root.columnconfigure(0, weight=1)
@@ -209,65 +313,72 @@ class PeerMonitorGUI:
         main.columnconfigure(1, weight=2, minsize=600)
         main.rowconfigure(2, weight=1)
         
+    def setup_text_tags(self):
+        """Configures details text formatting tags for the current theme"""
+        c = self.colors
+        
+        for tag, (color_key, font) in self.TEXT_TAGS.items():
+            self.details_text.tag_config(tag, foreground=c[color_key], font=font)
+        
     def scan_peers(self):
         """Scans data_peer* folders and collects information"""
         peers_data = {}
         
         for peer_dir in sorted(self.base_dir.glob('data_peer*')):
-            if not peer_dir.is_dir():
+            m = _PEER_NUM.match(peer_dir.name)
+            if not m or not peer_dir.is_dir():
                 continue
                 
+            peer_num = int(m.group(1))
             peer_info = {
+                'num': peer_num,
+                'container': f"peer{peer_num}",
+                'port': 5000 + peer_num,
+                'path': peer_dir,
                 'chunks': defaultdict(list), 
                 'manifests': [], 
                 'files': [],
                 'unknown': []
             }
             
-            # 1. Collect all manifests and their chunk hashes
-            known_chunk_hashes = set()
+            # 1. Collect all manifests and index their chunk hashes:
+            #    chunk_hash -> (manifest key, original file name).
+            #    Keys are interned so lookups with interned names hit on identity.
+            chunk_index = {}
             manifest_files = set()
             
             # First pass: Manifests
             for file_path in peer_dir.glob('*.manifest.json'):
                 try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        data = json.loads(f.read().strip())
+                    with open(file_path, 'rb') as f:
+                        data = _json_loads(f.read())
                         manifest_hash = file_path.name.replace('.manifest.json', '')
                         peer_info['manifests'].append({'hash': file_path.name, 'data': data})
-                        manifest_files.add(file_path.name)
+                        manifest_files.add(sys.intern(file_path.name))
                         
+                        owner = (manifest_hash, data.get('filename', 'Unknown'))
                         for chunk_info in data.get('chunks', []):
                             chunk_hash = chunk_info.get('hash') if isinstance(chunk_info, dict) else chunk_info
                             if chunk_hash:
-                                known_chunk_hashes.add(chunk_hash)
+                                # First manifest listing the chunk owns it
+                                chunk_index.setdefault(sys.intern(chunk_hash), owner)
                 except Exception as e:
                     peer_info['unknown'].append({'hash': file_path.name, 'error': str(e)})
 
-            # Second pass: Files and Chunks
-            for file_path in peer_dir.iterdir():
-                if not file_path.is_file():
-                    continue
-                    
-                filename = file_path.name
+            # Second pass: Files and Chunks (chunks live in shard subfolders)
+            for entry in _iter_peer_files(peer_dir):
+                filename = sys.intern(entry.name)
                 if filename in manifest_files:
                     continue
                     
-                if filename in known_chunk_hashes:
+                owner = chunk_index.get(filename)
+                if owner:
                     # It's a known chunk
-                    found = False
-                    for m in peer_info['manifests']:
-                        m_data = m['data']
-                        m_chunks = [c.get('hash') if isinstance(c, dict) else c for c in m_data.get('chunks', [])]
-                        if filename in m_chunks:
-                            peer_info['chunks'][m['hash'].replace('.manifest.json', '')].append({
-                                'hash': filename,
-                                'file_name': m_data.get('filename', 'Unknown')
-                            })
-                            found = True
-                            break
-                    if not found:
-                        peer_info['chunks']['orphan'].append({'hash': filename})
+                    manifest_hash, file_name = owner
+                    peer_info['chunks'][manifest_hash].append({
+                        'hash': filename,
+                        'file_name': file_name
+                    })
                 else:
                     # Non è un manifest, non è un chunk conosciuto.
                     # Heuristic: Se sembra un hash SHA256 (64 hex chars), è un orphan chunk
@@ -276,13 +387,14 @@ class PeerMonitorGUI:
                     else:
                         # It's a whole file
                         peer_info['files'].append(filename)
-            
+        
             peers_data[peer_dir.name] = peer_info
         
         return peers_data
     
     def refresh_data(self):
         """Updates data by scanning folders"""
+        self._invalidate_containers()
         self.peers_data = self.scan_peers()
         self.update_peer_list()
         
@@ -298,18 +410,20 @@ class PeerMonitorGUI:
         """Toggles between dark and light theme"""
         self.dark_mode = not self.dark_mode
         self.colors = self.THEMES['dark' if self.dark_mode else 'light']
+        c = self.colors
         
-        # Recreates interface
-        for widget in self.root.winfo_children():
-            widget.destroy()
-        
+        # ttk widgets follow their styles: reconfiguring them is enough
         self.setup_styles()
-        self.create_widgets()
-        self.refresh_data()
+        
+        # Plain tk widgets carry their own colors and must be updated one by one
+        self.root.configure(bg=c['bg'])
+        self.peer_listbox.config(bg=c['bg3'], fg=c['text'], selectbackground=c['accent'])
+        self.details_text.config(bg=c['bg3'], fg=c['text'], insertbackground=c['accent'])
+        self.setup_text_tags()
 
     def get_peer_status(self, peer_name):
         """Returns peer status icon"""
-        container_name = peer_name.replace("data_", "")
+        container_name = self.peers_data[peer_name]['container']
         running = self.get_running_containers()
         all_containers = self.get_all_containers()
         
@@ -319,57 +433,164 @@ class PeerMonitorGUI:
             return "● "  # Giallo - Stopped
         return "○ "  # Bianco - Not created
 
-    def get_running_containers(self):
-        """Gets running Docker containers"""
+    def _connect_docker(self):
+        """Docker Engine API client (no CLI process per call), None if unavailable"""
+        try:
+            import docker
+        except ImportError:
+            return None  # Optional: without the SDK the docker CLI is used
+        try:
+            client = docker.from_env()
+            client.ping()
+            return client
+        except Exception:
+            return None
+
+    def _resolve_peer_runtime(self):
+        """
+        Looks up the peer image and network once at startup. Passing IDs to
+        run skips the daemon's per-run name lookup (and any registry pull).
+        """
+        image, network = PEER_IMAGE, PEER_NETWORK
+        self._runtime_missing = []
+        if not self._dc:
+            return image, network
         try:
-            result = subprocess.check_output(
-                ["docker", "ps", "--format", "{{.Names}}"],
-                stderr=subprocess.STDOUT
-            ).decode().splitlines()
-            return set(result)
+            image = self._dc.images.get(PEER_IMAGE).id
+        except Exception:
+            self._runtime_missing.append(f"image '{PEER_IMAGE}'")
+        try:
+            network = self._dc.networks.get(PEER_NETWORK).id
+        except Exception:
+            self._runtime_missing.append(f"network '{PEER_NETWORK}'")
+        return image, network
+
+    def _list_container_names(self, all_containers=False):
+        """Names of Docker containers (running only, or all)"""
+        if self._dc:
+            # Low-level listing: a single API call, no per-container inspect
+            return {name.lstrip('/')
+                    for c in self._dc.api.containers(all=all_containers)
+                    for name in c.get('Names', [])}
+        import subprocess
+        cmd = ["docker", "ps", "--format", "{{.Names}}"]
+        if all_containers:
+            cmd.insert(2, "-a")
+        return set(subprocess.check_output(cmd, stderr=subprocess.STDOUT).decode().splitlines())
+
+    def _cached_containers(self, key):
+        """Container names from the short TTL cache, listed again when stale"""
+        cached = self._docker_cache.get(key)
+        now = time.monotonic()
+        if cached and now - cached[0] <= self.DOCKER_CACHE_TTL:
+            return cached[1]
+        try:
+            names = self._list_container_names(all_containers=(key == 'all'))
         except Exception:
             return set()
+        self._docker_cache[key] = (now, names)
+        return names
+
+    def _invalidate_containers(self):
+        """Forgets cached container lists (after start/stop/run/rm or a refresh)"""
+        self._docker_cache = {}
+
+    def get_running_containers(self):
+        """Gets running Docker containers"""
+        return self._cached_containers('running')
 
     def get_all_containers(self):
         """Gets all Docker containers"""
+        return self._cached_containers('all')
+
+    def _warn_missing_runtime(self):
+        """Warns once (Tk thread) if the peer image/network was not found at startup"""
+        if self._runtime_missing and not self._runtime_warned:
+            # Warn once, then let docker report its own error on each attempt
+            self._runtime_warned = True
+            messagebox.showwarning("Warning",
+                f"⚠️ Docker {' and '.join(self._runtime_missing)} not found.\n"
+                f"Start the cluster with docker-compose first.")
+
+    def _run_peer_container(self, peer_name, port, peer_data):
+        """Creates and starts a peer container bound to its data folder"""
+        env = {
+            "PORT": "5000",
+            "DATA_DIR": "/app/data",
+            "SELF_ID": f"{peer_name}:5000",
+            "KNOWN_PEERS": PEER_KNOWN_PEERS
+        }
+        try:
+            if self._dc:
+                self._dc.containers.run(self._peer_image, name=peer_name, detach=True,
+                                        network=self._peer_network,
+                                        ports={'5000/tcp': port},
+                                        volumes={str(peer_data): {'bind': '/app/data', 'mode': 'rw'}},
+                                        environment=env)
+                return
+            import subprocess
+            cmd = [
+                "docker", "run", "-d", "--pull=never", "--name", peer_name,
+                "--network", PEER_NETWORK,
+                "-p", f"{port}:5000",
+                "-v", f"{str(peer_data)}:/app/data"
+            ]
+            for key, value in env.items():
+                cmd += ["-e", f"{key}={value}"]
+            cmd.append(PEER_IMAGE)
+            subprocess.check_call(cmd, stderr=subprocess.STDOUT)
+        finally:
+            self._invalidate_containers()
+
+    def _container_action(self, container_name, action, check=True):
+        """
+        Runs start/stop/rm/"rm -f" on a container; errors are ignored when check=False.
+        "rm -f" stops and removes in a single daemon round-trip.
+        """
         try:
-            result = subprocess.check_output(
-                ["docker", "ps", "-a", "--format", "{{.Names}}"],
-                stderr=subprocess.STDOUT
-            ).decode().splitlines()
-            return set(result)
+            import subprocess
+            if self._dc:
+                container = self._dc.containers.get(container_name)
+                {'start': container.start, 'stop': container.stop, 'rm': container.remove,
+                 'rm -f': lambda: container.remove(force=True)}[action]()
+            elif check:
+                subprocess.check_call(["docker", *action.split(), container_name])
+            else:
+                subprocess.run(["docker", *action.split(), container_name], check=False, stderr=subprocess.DEVNULL)
         except Exception:
-            return set()
+            if check:
+                raise
+        finally:
+            self._invalidate_containers()
 
     def add_peer(self):
         """Creates a new peer and joins it to the network"""
         try:
-            existing_peers = [int(p.name.replace("data_peer", "")) 
-                            for p in self.base_dir.glob("data_peer*") 
-                            if p.name.replace("data_peer", "").isdigit()]
+            # peers_data (last refresh) gives the starting point; the ID is claimed on
+            # disk with an exclusive mkdir, since a creation still in flight is not
+            # in the cache yet and two quick clicks must not get the same peer
+            existing_peers = [p['num'] for p in self.peers_data.values()]
             next_id = max(existing_peers, default=0) + 1
-            new_peer_data = self.base_dir / f"data_peer{next_id}"
-            new_peer_data.mkdir(exist_ok=True)
+            while True:
+                new_peer_data = self.base_dir / f"data_peer{next_id}"
+                try:
+                    new_peer_data.mkdir(exist_ok=False)
+                    break
+                except FileExistsError:
+                    next_id += 1
 
             peer_name = f"peer{next_id}"
             port = 5000 + next_id
             
-            cmd = [
-                "docker", "run", "-d", "--name", peer_name,
-                "--network", "eldenringtorrent-_p2p_net",
-                "-p", f"{port}:5000",
-                "-v", f"{str(new_peer_data)}:/app/data",
-                "-e", "PORT=5000", "-e", "DATA_DIR=/app/data",
-                "-e", f"SELF_ID={peer_name}:5000",
-                "-e", "KNOWN_PEERS=peer1:5000,peer2:5000,peer3:5000,peer4:5000,peer5:5000,peer6:5000,peer7:5000",
-                "eldenringtorrent--peer1"
-            ]
-            subprocess.check_call(cmd, stderr=subprocess.STDOUT)
+            def on_done(_):
+                messagebox.showinfo("Success", f"✅ Peer {peer_name} created!\nPort: {port}")
+                self.info_label.config(text=f"🟢 {peer_name} added")
+                self.root.after(1000, self.refresh_data)
 
-            messagebox.showinfo("Success", f"✅ Peer {peer_name} created!\nPort: {port}")
-            self.info_label.config(text=f"🟢 {peer_name} added")
-            sleep(1)
-            self.refresh_data()
+            self._warn_missing_runtime()
+            self.info_label.config(text=f"🚀 Creating {peer_name}...")
+            self._run_async(lambda: self._run_peer_container(peer_name, port, new_peer_data),
+                            on_done, self._error_callback("❌ Error creating peer"))
         except Exception as e:
             messagebox.showerror("Error", f"❌ Error: {e}")
             self.info_label.config(text=f"❌ Error creating peer")
@@ -377,13 +598,9 @@ class PeerMonitorGUI:
     def join_existing_peer(self):
         """Rejoin existing peer with data"""
         try:
-            existing_data_dirs = [p.name.replace("data_peer", "") 
-                                 for p in self.base_dir.glob("data_peer*") 
-                                 if p.name.replace("data_peer", "").isdigit()]
-            
             running = self.get_running_containers()
-            stopped_peers = [(num, f"peer{num}") for num in existing_data_dirs 
-                           if f"peer{num}" not in running]
+            stopped_peers = [(p['num'], p['container']) for p in self.peers_data.values()
+                           if p['container'] not in running]
             
             if not stopped_peers:
                 messagebox.showinfo("Info", "⚠️ No peer to rejoin")
@@ -404,10 +621,14 @@ class PeerMonitorGUI:
                                selectbackground=self.colors['accent'])
             listbox.pack(fill=tk.BOTH, expand=True, padx=15, pady=10)
             
+            rows = []
             for peer_num, peer_name in stopped_peers:
-                data_dir = self.base_dir / f"data_peer{peer_num}"
-                num_files = len(list(data_dir.glob("*"))) if data_dir.exists() else 0
-                listbox.insert(tk.END, f"🟡 {peer_name:<10} │ {num_files} files")
+                # File count from the last scan: no directory walk per dialog
+                p = self.peers_data[f"data_{peer_name}"]
+                num_files = (len(p['files']) + len(p['manifests'])
+                             + sum(len(chunks) for chunks in p['chunks'].values()))
+                rows.append(f"🟡 {peer_name:<10} │ {num_files} files")
+            listbox.insert(tk.END, *rows)
             
             def do_join():
                 sel = listbox.curselection()
@@ -431,103 +652,151 @@ class PeerMonitorGUI:
         """Starts peer container"""
         try:
             peer_data = self.base_dir / f"data_peer{peer_num}"
-            port = 5000 + int(peer_num)
+            port = 5000 + peer_num
             
-            if peer_name in self.get_all_containers():
-                subprocess.check_call(["docker", "start", peer_name])
-                messagebox.showinfo("Success", f"✅ {peer_name} restarted!")
-            else:
-                cmd = [
-                    "docker", "run", "-d", "--name", peer_name,
-                    "--network", "eldenringtorrent-_p2p_net",
-                    "-p", f"{port}:5000",
-                    "-v", f"{str(peer_data)}:/app/data",
-                    "-e", "PORT=5000", "-e", "DATA_DIR=/app/data",
-                    "-e", f"SELF_ID={peer_name}:5000",
-                    "-e", "KNOWN_PEERS=peer1:5000,peer2:5000,peer3:5000,peer4:5000,peer5:5000,peer6:5000,peer7:5000",
-                    "eldenringtorrent--peer1"
-                ]
-                subprocess.check_call(cmd)
-                messagebox.showinfo("Success", f"✅ {peer_name} rejoined!")
-            
-            self.info_label.config(text=f"🟢 {peer_name} online")
-            sleep(1)
-            self.refresh_data()
+            exists = peer_name in self.get_all_containers()
+
+            def work():
+                if exists:
+                    self._container_action(peer_name, "start")
+                else:
+                    self._run_peer_container(peer_name, port, peer_data)
+
+            def on_done(_):
+                messagebox.showinfo("Success", f"✅ {peer_name} {'restarted' if exists else 'rejoined'}!")
+                self.info_label.config(text=f"🟢 {peer_name} online")
+                self.root.after(1000, self.refresh_data)
+
+            if not exists:
+                self._warn_missing_runtime()
+            self.info_label.config(text=f"🔄 Starting {peer_name}...")
+            self._run_async(work, on_done)
         except Exception as e:
             messagebox.showerror("Error", f"❌ Error: {e}")
 
     def leave_peer(self):
         """Peer leaves network (container stopped)"""
         try:
-            sel = self.peer_listbox.curselection()
-            if not sel:
+            peer_name = self._selected_peer()
+            if not peer_name:
                 messagebox.showwarning("Warning", "⚠️ Seleziona un peer")
                 return
 
-            peer_name = sorted(self.peers_data.keys())[sel[0]]
-            container_name = peer_name.replace("data_", "")
+            container_name = self.peers_data[peer_name]['container']
+            port = self.peers_data[peer_name]['port']
 
             if container_name not in self.get_running_containers():
                 messagebox.showinfo("Info", f"⚠️ {container_name} is not active")
                 return
 
-            # Graceful shutdown
-            try:
-                peer_num = container_name.replace("peer", "")
-                port = 5000 + int(peer_num)
-                requests.post(f"http://localhost:{port}/leave",
-                            json={"peer_id": f"{container_name}:5000"}, timeout=10)
-            except Exception:
-                pass
-
-            subprocess.check_call(["docker", "stop", container_name])
-            messagebox.showinfo("Success", f"✅ {container_name} offline")
-            self.info_label.config(text=f"🚪 {container_name} in leave")
-            sleep(1)
-            self.refresh_data()
+            def work():
+                self._request_leave(container_name, port)
+                self._container_action(container_name, "stop")
+
+            def on_done(_):
+                messagebox.showinfo("Success", f"✅ {container_name} offline")
+                self.info_label.config(text=f"🚪 {container_name} in leave")
+                self.root.after(1000, self.refresh_data)
+
+            self.info_label.config(text=f"🚪 {container_name} leaving...")
+            self._run_async(work, on_done)
         except Exception as e:
             messagebox.showerror("Error", f"❌ Error: {e}")
 
     def delete_peer(self):
         """Completely deletes peer"""
         try:
-            sel = self.peer_listbox.curselection()
-            if not sel:
+            peer_name = self._selected_peer()
+            if not peer_name:
                 messagebox.showwarning("Warning", "⚠️ Seleziona un peer")
                 return
 
-            peer_name = sorted(self.peers_data.keys())[sel[0]]
-            container_name = peer_name.replace("data_", "")
-            data_dir = self.base_dir / peer_name
+            container_name = self.peers_data[peer_name]['container']
+            port = self.peers_data[peer_name]['port']
+            data_dir = self.peers_data[peer_name]['path']
 
             if not messagebox.askyesno("Confirm",
                 f"⚠️ Delete {container_name}?\nThis operation is IRREVERSIBLE!"):
                 return
 
-            # Graceful shutdown
-            try:
-                peer_num = container_name.replace("peer", "")
-                port = 5000 + int(peer_num)
-                requests.post(f"http://localhost:{port}/leave",
-                            json={"peer_id": f"{container_name}:5000"}, timeout=10)
-            except Exception:
-                pass
+            def work():
+                self._request_leave(container_name, port)
+                self._container_action(container_name, "rm -f", check=False)
 
-            subprocess.run(["docker", "stop", container_name], check=False, stderr=subprocess.DEVNULL)
-            subprocess.run(["docker", "rm", container_name], check=False, stderr=subprocess.DEVNULL)
+                if data_dir.exists():
+                    import shutil
+                    shutil.rmtree(data_dir)
 
-            if data_dir.exists():
-                shutil.rmtree(data_dir)
+            def on_done(_):
+                messagebox.showinfo("Success", f"✅ {container_name} deleted!")
+                self.info_label.config(text=f"🗑️ {container_name} deleted")
+                self.root.after(2000, self.refresh_data)
 
-            messagebox.showinfo("Success", f"✅ {container_name} deleted!")
-            self.info_label.config(text=f"🗑️ {container_name} deleted")
-            sleep(1)
-            sleep(1)
-            self.refresh_data()
+            self.info_label.config(text=f"🗑️ Deleting {container_name}...")
+            self._run_async(work, on_done, self._error_callback("❌ Delete error"))
         except Exception as e:
             messagebox.showerror("Error", f"❌ Error: {e}")
             self.info_label.config(text=f"❌ Delete error")
 
+    def _request_leave(self, container_name, port):
+        """Graceful shutdown: asks the peer to hand over its data (best effort)"""
+        try:
+            self._http.post(f"http://localhost:{port}/leave",
+                            json={"peer_id": f"{container_name}:5000"}, timeout=10)
+        except Exception:
+            pass
+
+    def _post_ui(self, callback, *args):
+        """Queues callback(*args) for the Tk thread (safe to call from any thread)"""
+        self._ui_queue.put((callback, args))
+
+    def _drain_ui_queue(self):
+        """Runs on the Tk thread every 50 ms: dispatches callbacks posted by workers"""
+        try:
+            while True:
+                callback, args = self._ui_queue.get_nowait()
+                try:
+                    callback(*args)
+                except Exception:
+                    # Same reporting as an exception in any Tk callback; keeps the poller alive
+                    self.root.report_callback_exception(*sys.exc_info())
+        except queue.Empty:
+            pass
+        self.root.after(50, self._drain_ui_queue)
+
+    def _run_async(self, work, on_done, on_error=None):
+        """
+        Runs blocking work (HTTP, docker) in a daemon thread and hands the
+        result back through the UI queue, so the mainloop never freezes and
+        Tk is only ever called from its own thread.
+        """
+        on_error = on_error or (lambda e: messagebox.showerror("Error", f"❌ Error: {e}"))
+
+        def worker():
+            try:
+                result = work()
+            except Exception as e:
+                self._post_ui(on_error, e)
+                return
+            self._post_ui(on_done, result)
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _error_callback(self, label, message="❌ Error", timeout=None):
+        """
+        Builds the on_error callback for _run_async: error dialog plus status label.
+        timeout=(dialog text, label) reports a requests Timeout separately.
+        """
+        def on_error(e):
+            from requests.exceptions import Timeout
+            if timeout and isinstance(e, Timeout):
+                messagebox.showerror("Error", timeout[0])
+                self.info_label.config(text=timeout[1])
+            else:
+                messagebox.showerror("Error", f"{message}: {e}")
+                self.info_label.config(text=label)
+        return on_error
+
     def search_network(self):
         """Search files in network by name or metadata (e.g. Brad Pitt)"""
         query_str = self.search_var.get().strip()
@@ -536,25 +805,20 @@ class PeerMonitorGUI:
             return
 
         # Choose a random active peer to perform search
-        running_peers = list(self.get_running_containers())
+        running = self.get_running_containers()
+        running_peers = [p for p in self._peer_order if self.peers_data[p]['container'] in running]
         if not running_peers:
             messagebox.showwarning("Warning", "⚠️ No active peer to perform search")
             return
             
         # Priority to a selected peer, otherwise random
-        sel = self.peer_listbox.curselection()
-        if sel:
-            peer_name = sorted(self.peers_data.keys())[sel[0]].replace("data_", "")
-            if peer_name in running_peers:
-                searcher_peer = peer_name
-            else:
-                searcher_peer = running_peers[0]
-        else:
-            searcher_peer = running_peers[0]
+        peer_name = self._selected_peer()
+        if peer_name not in running_peers:
+            peer_name = running_peers[0]
+        searcher_peer = self.peers_data[peer_name]['container']
 
         try:
-            peer_num = searcher_peer.replace("peer", "")
-            port = 5000 + int(peer_num)
+            port = self.peers_data[peer_name]['port']
             
             # Build the query. Heuristically:
             # - If contains " ", assume generic Actor or Title
@@ -587,23 +851,29 @@ class PeerMonitorGUI:
                     params["actor"] = query_str
             
             self.info_label.config(text=f"🔍 Searching '{query_str}' via {searcher_peer}...")
-            self.root.update()
             
-            # API Call
+            # API Call (and JSON decoding) off the Tk thread
             url = f"http://localhost:{port}/search"
-            response = requests.get(url, params=params, timeout=10)
-            
-            if response.status_code == 200:
-                data = response.json()
-                results = data.get("results", [])
-                partial = data.get("partial_result", False)
-                
-                # Display results
-                self.show_search_results(query_str, results, partial, searcher_peer)
-                self.info_label.config(text=f"✅ Found {len(results)} results")
-            else:
-                self.info_label.config(text="❌ Search failed")
-                messagebox.showerror("Error", f"Search error: {response.status_code}")
+
+            def work():
+                response = self._http.get(url, params=params, timeout=10)
+                return response.status_code, _json_loads(response.content) if response.status_code == 200 else None
+
+            def on_done(outcome):
+                status_code, data = outcome
+                if status_code == 200:
+                    results = data.get("results", [])
+                    partial = data.get("partial_result", False)
+                    
+                    # Display results
+                    self.show_search_results(query_str, results, partial, searcher_peer)
+                    self.info_label.config(text=f"✅ Found {len(results)} results")
+                else:
+                    self.info_label.config(text="❌ Search failed")
+                    messagebox.showerror("Error", f"Search error: {status_code}")
+
+            self._run_async(work, on_done,
+                            self._error_callback("❌ Search exception", message="Search exception"))
                 
         except Exception as e:
             messagebox.showerror("Error", f"Search exception: {e}")
@@ -635,17 +905,20 @@ class PeerMonitorGUI:
         res_text.tag_config('meta', foreground=self.colors['text2'])
         res_text.tag_config('host', foreground=self.colors['success'])
         
+        # Built in Python, rendered with one Tcl call (hundreds of results on a broadcast)
+        parts = []
         if not results:
-            res_text.insert(tk.END, "No results found.")
+            parts.append(("No results found.", ()))
         else:
             for idx, r in enumerate(results, 1):
                 fname = r.get('filename', 'Unknown')
                 host = r.get('host', 'Unknown')
                 meta = r.get('metadata', {})
                 
-                res_text.insert(tk.END, f"{idx}. {fname}\n", 'title')
-                res_text.insert(tk.END, f"   Host: {host}\n", 'host')
-                res_text.insert(tk.END, f"   Metadata: {json.dumps(meta, indent=0)}\n\n", 'meta')
+                parts.append((f"{idx}. {fname}\n", 'title'))
+                parts.append((f"   Host: {host}\n", 'host'))
+                parts.append((f"   Metadata: {json.dumps(meta, indent=0)}\n\n", 'meta'))
+        self._render_text(res_text, parts)
                 
         # Close btn
         ttk.Button(dialog, text="Close", command=dialog.destroy, 
@@ -654,13 +927,12 @@ class PeerMonitorGUI:
     def upload_file(self):
         """Upload file to a selected peer"""
         try:
-            sel = self.peer_listbox.curselection()
-            if not sel:
+            peer_name = self._selected_peer()
+            if not peer_name:
                 messagebox.showwarning("Warning", "⚠️ Select a peer first")
                 return
 
-            peer_name = sorted(self.peers_data.keys())[sel[0]]
-            container_name = peer_name.replace("data_", "")
+            container_name = self.peers_data[peer_name]['container']
 
             # Verify if peer is active
             if container_name not in self.get_running_containers():
@@ -677,56 +949,60 @@ class PeerMonitorGUI:
             if not file_path:
                 return
             
-            # Get peer port
-            peer_num = container_name.replace("peer", "")
-            port = 5000 + int(peer_num)
+            # Get peer port and (absolute) data folder
+            peer_info = self.peers_data[peer_name]
+            port = peer_info['port']
             
             # Determine file path in container
             file_path_obj = Path(file_path)
-            data_dir = self.base_dir / peer_name
-            dest_path = data_dir / file_path_obj.name
+            dest_path = peer_info['path'] / file_path_obj.name
             
-            # If file is already in peer folder, use path directly
-            if file_path_obj.resolve() == dest_path.resolve():
-                container_path = f"/app/data/{file_path_obj.name}"
-            else:
-                # Otherwise, copy file to peer folder (if not exists)
-                if not dest_path.exists():
-                    import shutil
-                    shutil.copy2(file_path, dest_path)
-                    messagebox.showinfo("Info", f"📂 File copied to {peer_name}")
-                container_path = f"/app/data/{file_path_obj.name}"
+            # If file is already in peer folder, use path directly.
+            # Otherwise, copy file to peer folder (if not exists).
+            # Both paths are absolute: a string compare avoids realpath on each side,
+            # and a file already in the folder exists anyway (one stat at most).
+            same_file = os.path.normcase(os.path.abspath(file_path)) == os.path.normcase(str(dest_path))
+            needs_copy = not same_file and not dest_path.exists()
+            container_path = f"/app/data/{file_path_obj.name}"
             
             # API Call for store_file
             url = f"http://localhost:{port}/store_file"
             payload = {"filename": container_path}
             
-            self.info_label.config(text=f"📤 Uploading {file_path_obj.name}...")
-            self.root.update()
-            
-            response = requests.post(url, json=payload, timeout=30)
+            def work():
+                # The copy of a large file runs here too, off the Tk thread
+                if needs_copy:
+                    _fast_copy(file_path, dest_path)
+                    self._post_ui(lambda: self.info_label.config(
+                        text=f"📤 Copied to {peer_name}, uploading {file_path_obj.name}..."))
+                return self._http.post(url, json=payload, timeout=30)
             
-            if response.status_code == 200:
-                result = response.json()
-                messagebox.showinfo("Success", 
-                    f"✅ File uploaded successfully!\n\n"
-                    f"Peer: {container_name}\n"
-                    f"File: {file_path_obj.name}\n"
-                    f"Manifest Hash: {result.get('manifest_hash', 'N/A')[:40]}...")
-                self.info_label.config(text=f"✅ Upload completed on {container_name}")
+            if needs_copy:
+                self.info_label.config(text=f"📂 Copying {file_path_obj.name} to {peer_name}...")
             else:
-                messagebox.showerror("Error", 
-                    f"❌ Upload error!\n\n"
-                    f"Status: {response.status_code}\n"
-                    f"Response: {response.text[:200]}")
-                self.info_label.config(text=f"❌ Upload error")
-            
-            sleep(1)
-            self.refresh_data()
-            
-        except requests.exceptions.Timeout:
-            messagebox.showerror("Error", "❌ Timeout: peer not responding")
-            self.info_label.config(text=f"❌ Upload timeout")
+                self.info_label.config(text=f"📤 Uploading {file_path_obj.name}...")
+            
+            def on_done(response):
+                if response.status_code == 200:
+                    result = response.json()
+                    messagebox.showinfo("Success", 
+                        f"✅ File uploaded successfully!\n\n"
+                        f"Peer: {container_name}\n"
+                        f"File: {file_path_obj.name}\n"
+                        f"Manifest Hash: {result.get('manifest_hash', 'N/A')[:40]}...")
+                    self.info_label.config(text=f"✅ Upload completed on {container_name}")
+                else:
+                    messagebox.showerror("Error", 
+                        f"❌ Upload error!\n\n"
+                        f"Status: {response.status_code}\n"
+                        f"Response: {response.text[:200]}")
+                    self.info_label.config(text=f"❌ Upload error")
+                
+                self.root.after(1000, self.refresh_data)
+            
+            self._run_async(work, on_done, self._error_callback(
+                "❌ Upload error", timeout=("❌ Timeout: peer not responding", "❌ Upload timeout")))
+            
         except Exception as e:
             messagebox.showerror("Error", f"❌ Error: {e}")
             self.info_label.config(text=f"❌ Upload error")
@@ -734,13 +1010,12 @@ class PeerMonitorGUI:
     def download_file(self):
         """Download file from a selected peer"""
         try:
-            sel = self.peer_listbox.curselection()
-            if not sel:
+            peer_name = self._selected_peer()
+            if not peer_name:
                 messagebox.showwarning("Warning", "⚠️ Select a peer first")
                 return
 
-            peer_name = sorted(self.peers_data.keys())[sel[0]]
-            container_name = peer_name.replace("data_", "")
+            container_name = self.peers_data[peer_name]['container']
 
             # Verify if peer is active
             if container_name not in self.get_running_containers():
@@ -772,13 +1047,15 @@ class PeerMonitorGUI:
             listbox.pack(fill=tk.BOTH, expand=True, padx=15, pady=10)
             
             # Populate list with files available in network
-            available_files = {}
+            available_files = []
+            rows = []
             for manifest_info in peer_info['manifests']:
                 filename = manifest_info['data'].get('filename', 'Unknown')
                 num_chunks = len(manifest_info['data'].get('chunks', []))
                 display_name = Path(filename).name if filename != 'Unknown' else manifest_info['hash'][:20]
-                listbox.insert(tk.END, f"📄 {display_name:<40} │ {num_chunks} chunks")
-                available_files[listbox.size() - 1] = display_name
+                rows.append(f"📄 {display_name:<40} │ {num_chunks} chunks")
+                available_files.append(display_name)
+            listbox.insert(tk.END, *rows)
             
             def do_download():
                 sel_idx = listbox.curselection()
@@ -788,7 +1065,7 @@ class PeerMonitorGUI:
                 
                 filename = available_files[sel_idx[0]]
                 dialog.destroy()
-                self._perform_download(container_name, filename)
+                self._perform_download(container_name, peer_info['port'], filename)
             
             btn_frame = ttk.Frame(dialog, style='Header.TFrame', padding="15")
             btn_frame.pack(fill=tk.X)
@@ -800,74 +1077,76 @@ class PeerMonitorGUI:
         except Exception as e:
             messagebox.showerror("Error", f"❌ Errore: {e}")
 
-    def _perform_download(self, container_name, filename):
+    def _perform_download(self, container_name, port, filename):
         """Esegue il download effettivo del file"""
         try:
-            peer_num = container_name.replace("peer", "")
-            port = 5000 + int(peer_num)
-            
             # Chiamata API per fetch_file
             url = f"http://localhost:{port}/fetch_file"
             payload = {"filename": filename}
             
             self.info_label.config(text=f"📥 Downloading {filename}...")
-            self.root.update()
             
-            response = requests.post(url, json=payload, timeout=60)
-            
-            if response.status_code == 200:
-                result = response.json()
-                
-                # Build path of downloaded file
-                peer_data_dir = self.base_dir / f"data_{container_name}"
-                downloaded_file = peer_data_dir / f"rebuilt_{filename}"
-                
-                if downloaded_file.exists():
-                    messagebox.showinfo("Success", 
-                        f"✅ File downloaded successfully!\n\n"
-                        f"Peer: {container_name}\n"
-                        f"File: {filename}\n"
-                        f"Path: {downloaded_file}\n"
-                        f"Status: {result.get('status', 'N/A')}")
+            def work():
+                # Body decoded in the worker: only the dialogs run on the Tk thread
+                response = self._http.post(url, json=payload, timeout=60)
+                if response.status_code == 200:
+                    return response.status_code, _json_loads(response.content)
+                return response.status_code, response.text[:200]
+
+            def on_done(outcome):
+                status_code, result = outcome
+                if status_code == 200:
+                    # Build path of downloaded file
+                    peer_data_dir = self.base_dir / f"data_{container_name}"
+                    downloaded_file = peer_data_dir / f"rebuilt_{filename}"
+                    
+                    if downloaded_file.exists():
+                        messagebox.showinfo("Success", 
+                            f"✅ File downloaded successfully!\n\n"
+                            f"Peer: {container_name}\n"
+                            f"File: {filename}\n"
+                            f"Path: {downloaded_file}\n"
+                            f"Status: {result.get('status', 'N/A')}")
+                    else:
+                        messagebox.showinfo("Info", 
+                            f"✅ Download completed!\n\n"
+                            f"Peer: {container_name}\n"
+                            f"File: {filename}\n"
+                            f"Response: {result}")
+                    
+                    self.info_label.config(text=f"✅ Download completed: {filename}")
                 else:
-                    messagebox.showinfo("Info", 
-                        f"✅ Download completed!\n\n"
-                        f"Peer: {container_name}\n"
-                        f"File: {filename}\n"
+                    messagebox.showerror("Error", 
+                        f"❌ Download error!\n\n"
+                        f"Status: {status_code}\n"
                         f"Response: {result}")
+                    self.info_label.config(text=f"❌ Download error")
                 
-                self.info_label.config(text=f"✅ Download completed: {filename}")
-            else:
-                messagebox.showerror("Error", 
-                    f"❌ Download error!\n\n"
-                    f"Status: {response.status_code}\n"
-                    f"Response: {response.text[:200]}")
-                self.info_label.config(text=f"❌ Download error")
-            
-            sleep(1)
-            self.refresh_data()
-            
-        except requests.exceptions.Timeout:
-            messagebox.showerror("Error", "❌ Timeout: download is taking too long")
-            self.info_label.config(text=f"❌ Download timeout")
+                self.root.after(1000, self.refresh_data)
+            
+            self._run_async(work, on_done, self._error_callback(
+                "❌ Download error", timeout=("❌ Timeout: download is taking too long", "❌ Download timeout")))
+            
         except Exception as e:
             messagebox.showerror("Error", f"❌ Error: {e}")
             self.info_label.config(text=f"❌ Download error")
 
     def update_peer_list(self):
         """Update peer list"""
-        self.peer_listbox.delete(0, tk.END)
-        
         running = self.get_running_containers()
         all_containers = self.get_all_containers()
         
-        for peer_name in sorted(self.peers_data.keys()):
+        # Same order as the Listbox rows: selection handlers index into it
+        self._peer_order = sorted(self.peers_data.keys())
+        
+        rows = []
+        for peer_name in self._peer_order:
             peer_info = self.peers_data[peer_name]
             num_manifests = len(peer_info['manifests'])
             num_chunks = sum(len(chunks) for chunks in peer_info['chunks'].values())
             num_files = len(peer_info.get('files', []))
             
-            container_name = peer_name.replace("data_", "")
+            container_name = peer_info['container']
             
             # Determine status and symbol
             if container_name in running:
@@ -881,62 +1160,99 @@ class PeerMonitorGUI:
                 status_text = "N/A"
             
             display_text = f"{status_symbol} {status_text} {peer_name:<12} │ 📄 {num_manifests:>2} │ 📦 {num_chunks:>3} │ 📁 {num_files:>2}"
-            self.peer_listbox.insert(tk.END, display_text)
+            rows.append(display_text)
+        
+        # Nothing changed since the last refresh: keep the rows (and the selection)
+        if rows == self._peer_rows:
+            return
+        self._peer_rows = rows
+        
+        # Replace all rows with two Tcl calls instead of one insert per peer
+        self.peer_listbox.delete(0, tk.END)
+        if rows:
+            self.peer_listbox.insert(tk.END, *rows)
     
+    def _selected_peer(self):
+        """
+        Peer name of the selected Listbox row (None if nothing is selected).
+        _peer_order is sorted once per refresh; the bounds/membership check
+        guards against a selection event racing a list rebuild.
+        """
+        sel = self.peer_listbox.curselection()
+        if not sel or sel[0] >= len(self._peer_order):
+            return None
+        peer_name = self._peer_order[sel[0]]
+        return peer_name if peer_name in self.peers_data else None
+
     def on_peer_select(self, event):
         """Handles peer selection"""
-        sel = self.peer_listbox.curselection()
-        if sel:
-            peer_name = sorted(self.peers_data.keys())[sel[0]]
+        peer_name = self._selected_peer()
+        if peer_name:
             self.display_peer_details(peer_name)
     
     def display_peer_details(self, peer_name):
         """Displays peer details with compact layout"""
-        self.details_text.delete('1.0', tk.END)
         peer_info = self.peers_data[peer_name]
-        container_name = peer_name.replace("data_", "")
+        container_name = peer_info['container']
         
         # Header
         running = self.get_running_containers()
         status = "ONLINE" if container_name in running else ("OFFLINE" if container_name in self.get_all_containers() else "NOT CREATED")
         
-        self.details_text.insert(tk.END, f"═══ {peer_name.upper()} ═══\n", 'header')
-        self.details_text.insert(tk.END, f"Status: {status}\n\n", 'section')
+        # (text, tag) pairs, rendered in one shot at the end
+        parts = [
+            (f"═══ {peer_name.upper()} ═══\n", 'header'),
+            (f"Status: {status}\n\n", 'section')
+        ]
         
         # Whole Files
         if peer_info.get('files'):
-            self.details_text.insert(tk.END, f"📂 WHOLE FILES ({len(peer_info['files'])})\n", 'section')
+            parts.append((f"📂 WHOLE FILES ({len(peer_info['files'])})\n", 'section'))
             for f in peer_info['files']:
-                self.details_text.insert(tk.END, f"  • {f}\n", 'info')
-            self.details_text.insert(tk.END, "\n", 'value')
+                parts.append((f"  • {f}\n", 'info'))
+            parts.append(("\n", 'value'))
 
         # Manifests
         if peer_info['manifests']:
-            self.details_text.insert(tk.END, f"📋 MANIFESTS ({len(peer_info['manifests'])})\n", 'section')
+            parts.append((f"📋 MANIFESTS ({len(peer_info['manifests'])})\n", 'section'))
             for idx, m in enumerate(peer_info['manifests'][:3], 1):
-                self.details_text.insert(tk.END, f"  [{idx}] ", 'key')
-                self.details_text.insert(tk.END, f"{m['data'].get('filename', 'N/A')}\n", 'value')
-                self.details_text.insert(tk.END, f"      Hash: {m['hash'][:40]}...\n", 'value')
-                self.details_text.insert(tk.END, f"      Chunks: {len(m['data'].get('chunks', []))}\n\n", 'success')
+                parts.append((f"  [{idx}] ", 'key'))
+                parts.append((f"{m['data'].get('filename', 'N/A')}\n", 'value'))
+                parts.append((f"      Hash: {m['hash'][:40]}...\n", 'value'))
+                parts.append((f"      Chunks: {len(m['data'].get('chunks', []))}\n\n", 'success'))
             if len(peer_info['manifests']) > 3:
-                self.details_text.insert(tk.END, f"  ... and {len(peer_info['manifests'])-3} more\n\n", 'value')
+                parts.append((f"  ... and {len(peer_info['manifests'])-3} more\n\n", 'value'))
         
         # Chunks
-        self.details_text.insert(tk.END, "\n📦 CHUNKS\n", 'section')
+        parts.append(("\n📦 CHUNKS\n", 'section'))
         for file_hash, chunks in list(peer_info['chunks'].items())[:5]:
             if not chunks or file_hash == 'orphan':
                 continue
             file_name = chunks[0].get('file_name', 'Unknown')
-            self.details_text.insert(tk.END, f"  • {file_name}: ", 'key')
-            self.details_text.insert(tk.END, f"{len(chunks)} chunks\n", 'success')
+            parts.append((f"  • {file_name}: ", 'key'))
+            parts.append((f"{len(chunks)} chunks\n", 'success'))
         
         if peer_info['chunks'].get('orphan'):
-            self.details_text.insert(tk.END, f"\n  ⚠️ Orphan chunks: {len(peer_info['chunks']['orphan'])}\n", 'warning')
+            parts.append((f"\n  ⚠️ Orphan chunks: {len(peer_info['chunks']['orphan'])}\n", 'warning'))
         
         # Unknown
         if peer_info['unknown']:
-            self.details_text.insert(tk.END, f"\n⚠️ UNKNOWN FILES ({len(peer_info['unknown'])})\n", 'error')
-
+            parts.append((f"\n⚠️ UNKNOWN FILES ({len(peer_info['unknown'])})\n", 'error'))
+        
+        self._render_text(self.details_text, parts)
+    
+    def _render_text(self, widget, parts):
+        """
+        Replaces the content of a Text widget with (text, tag) pairs.
+        Tk's insert accepts 'chars tagList chars tagList ...', so the whole
+        content goes through a single Tcl call instead of one per line.
+        The widget's state is left as it was found.
+        """
+        state = widget.cget('state')
+        widget.configure(state=tk.NORMAL)
+        widget.delete('1.0', tk.END)
+        widget.insert('1.0', *[item for pair in parts for item in pair])
+        widget.configure(state=state)
 
 def main():
     root = tk.Tk()
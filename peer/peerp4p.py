@@ -1,9 +1,13 @@
 import os
 import time
 import random
+import socket
+import heapq
 import hashlib
+import json
 import requests
 import threading
+import concurrent.futures
 try:
     from peer import Peer, app
 except ImportError:
@@ -11,6 +15,13 @@ except ImportError:
     import api
     from api import app
 from functools import lru_cache
+from collections import OrderedDict
+
+try:
+    import orjson
+    _json_loads = orjson.loads  # decodifica diretta dei bytes, ~3x più veloce
+except ImportError:
+    _json_loads = json.loads
 
 ALTO_TTL = 30            
 ALTO_TOP_K = 6           
@@ -18,6 +29,12 @@ ALPHA = 0.7
 BETA = 0.3               
 RTT_TIMEOUT = 0.4        
 RTT_PENALTY = 9999.0
+ALTO_ENDPOINT_CACHE_SIZE = 4096
+
+# Sessione HTTP condivisa (keep-alive): le chiamate iTracker/ALTO riusano le connessioni
+_SESSION = requests.Session()
+_SESSION.mount("http://", requests.adapters.HTTPAdapter(pool_connections=64, pool_maxsize=64,
+                                                        max_retries=0, pool_block=False))
 
 class PeerP4P(Peer):
     def __init__(self, self_id, known_peers, data_dir, isp, region, itracker_url):
@@ -25,7 +42,8 @@ class PeerP4P(Peer):
         self.isp = isp
         self.region = region
         self.itracker_url = itracker_url.rstrip("/")
-        self._alto_cache = {"cost_map": None, "network_map": None, "endpoint_costs": {}, "ts": 0}
+        self._alto_cache = {"cost_map": None, "network_map": None, "endpoint_costs": OrderedDict(),
+                           "ts": {}, "inflight": {}}
         self._alto_lock = threading.Lock()
         self.register_to_itracker()
 
@@ -35,7 +53,7 @@ class PeerP4P(Peer):
     def register_to_itracker(self):
         payload = {"peer_id": self.self_id, "isp": self.isp, "region": self.region}
         try:
-            r = requests.post(f"{self.itracker_url}/register_peer", json=payload, timeout=3)
+            r = _SESSION.post(f"{self.itracker_url}/register_peer", json=payload, timeout=3)
             if r.status_code == 200:
                 print(f"Peer {self.self_id} registrato all’iTracker ({self.isp}, {self.region})")
             else:
@@ -46,55 +64,88 @@ class PeerP4P(Peer):
     # -------------------------
     # ALTO caching utilities
     # -------------------------
-    def _alto_need_refresh(self):
-        return time.time() - self._alto_cache.get("ts", 0) > ALTO_TTL
+    def _alto_need_refresh(self, key):
+        return time.time() - self._alto_cache["ts"].get(key, 0) > ALTO_TTL
 
-    def get_cost_map(self):
+    def _alto_get_map(self, key):
+        """
+        Single-flight GET of /alto/<key>: the lock only guards the cache, the first
+        thread that misses does the request and concurrent misses wait for it.
+        """
         with self._alto_lock:
-            if not self._alto_cache["cost_map"] or self._alto_need_refresh():
-                try:
-                    r = requests.get(f"{self.itracker_url}/alto/cost_map", timeout=2)
+            if self._alto_cache[key] and not self._alto_need_refresh(key):
+                return self._alto_cache[key]
+            inflight = self._alto_cache["inflight"].get(key)
+            leader = inflight is None
+            if leader:
+                inflight = self._alto_cache["inflight"][key] = threading.Event()
+
+        if not leader:
+            inflight.wait(timeout=2)
+        else:
+            try:
+                # iTracker down di recente: si tiene la mappa in cache senza attendere il timeout
+                if not self._circuit_open(self.itracker_url):
+                    r = _SESSION.get(f"{self.itracker_url}/alto/{key}", timeout=2)
                     if r.status_code == 200:
-                        data = r.json()
-                        self._alto_cache["cost_map"] = data.get("cost_map", {})
-                        self._alto_cache["ts"] = time.time()
-                except Exception:
-                    pass
-            return self._alto_cache.get("cost_map", {})
+                        data = _json_loads(r.content).get(key, {})
+                        with self._alto_lock:
+                            self._alto_cache[key] = data
+                            self._alto_cache["ts"][key] = time.time()
+                    self._record_result(self.itracker_url, r.status_code == 200)
+            except Exception:
+                self._record_result(self.itracker_url, False)
+            finally:
+                with self._alto_lock:
+                    self._alto_cache["inflight"].pop(key, None)
+                inflight.set()
 
-    def get_network_map(self):
         with self._alto_lock:
-            if not self._alto_cache["network_map"] or self._alto_need_refresh():
-                try:
-                    r = requests.get(f"{self.itracker_url}/alto/network_map", timeout=2)
-                    if r.status_code == 200:
-                        self._alto_cache["network_map"] = r.json().get("network_map", {})
-                        self._alto_cache["ts"] = time.time()
-                except Exception:
-                    pass
-            return self._alto_cache.get("network_map", {})
+            return self._alto_cache[key] or {}
+
+    def get_cost_map(self):
+        return self._alto_get_map("cost_map")
+
+    def get_network_map(self):
+        return self._alto_get_map("network_map")
 
     def get_endpoint_costs(self, dsts):
         """
         Ask tracer for endpoint costs for self -> dsts. Cache per-dst for ALTO_TTL.
         Returns dict {dst: cost_or_None}
         """
-        key = ",".join(sorted(dsts))
+        costs, stale = {}, []
+        now = time.time()
         with self._alto_lock:
-            cached = self._alto_cache["endpoint_costs"].get(key)
-            if cached and time.time() - cached["ts"] <= ALTO_TTL:
-                return cached["costs"]
-        # request
-        try:
-            r = requests.post(f"{self.itracker_url}/alto/endpoint_cost", json={"src": self.self_id, "dsts": dsts}, timeout=2)
-            if r.status_code == 200:
-                costs = r.json().get("costs", {})
-            else:
-                costs = {d: None for d in dsts}
-        except Exception:
-            costs = {d: None for d in dsts}
+            cache = self._alto_cache["endpoint_costs"]  # LRU: dst -> (ts, cost)
+            for d in dsts:
+                cached = cache.get(d)
+                if cached and now - cached[0] <= ALTO_TTL:
+                    costs[d] = cached[1]
+                    cache.move_to_end(d)
+                else:
+                    stale.append(d)
+        if not stale:
+            return costs
+        # request only the dsts without a fresh cost
+        fetched = {}
+        if not self._circuit_open(self.itracker_url):
+            try:
+                r = _SESSION.post(f"{self.itracker_url}/alto/endpoint_cost", json={"src": self.self_id, "dsts": stale}, timeout=2)
+                if r.status_code == 200:
+                    fetched = _json_loads(r.content).get("costs", {})
+                self._record_result(self.itracker_url, r.status_code == 200)
+            except Exception:
+                self._record_result(self.itracker_url, False)
+        now = time.time()
         with self._alto_lock:
-            self._alto_cache["endpoint_costs"][key] = {"ts": time.time(), "costs": costs}
+            cache = self._alto_cache["endpoint_costs"]
+            for d in stale:
+                costs[d] = fetched.get(d)
+                cache[d] = (now, costs[d])
+                cache.move_to_end(d)
+            while len(cache) > ALTO_ENDPOINT_CACHE_SIZE:
+                cache.popitem(last=False)
         return costs
 
     # -------------------------
@@ -102,19 +153,23 @@ class PeerP4P(Peer):
     # -------------------------
     def measure_rtt_ms(self, peer_addr):
         """
-        Measure a quick RTT to peer by requesting /ping with short timeout.
+        Measure a quick RTT to peer timing a raw TCP connect (one handshake,
+        no work for the remote Flask worker), with short timeout.
         peer_addr = "peer1:5000" or "hostname:port"
         Returns RTT in ms or RTT_PENALTY on failure.
         """
+        if self._circuit_open(peer_addr):
+            return RTT_PENALTY
         try:
-            url = f"http://{peer_addr}/ping"
-            start = time.time()
-            r = requests.get(url, timeout=RTT_TIMEOUT)
-            if r.status_code == 200:
-                return (time.time() - start) * 1000.0
-            else:
-                return RTT_PENALTY
+            host, port = peer_addr.rsplit(":", 1)
+            start = time.perf_counter()
+            with socket.create_connection((host, int(port)), timeout=RTT_TIMEOUT):
+                pass
+            rtt = (time.perf_counter() - start) * 1000.0
+            self._record_result(peer_addr, True)
+            return rtt
         except Exception:
+            self._record_result(peer_addr, False)
             return RTT_PENALTY
 
     # -------------------------
@@ -147,38 +202,39 @@ class PeerP4P(Peer):
                     c_val = float("inf")
             filled.append((p, c_val))
 
-        # 2) sort by cost and take top_k candidates
-        filled_sorted = sorted(filled, key=lambda x: x[1])
-        candidates = [p for p, _ in filled_sorted[:top_k]]
+        # 2) take the top_k cheapest candidates (same order as sorted(...)[:top_k])
+        top = heapq.nsmallest(top_k, filled, key=lambda x: x[1])
+        candidates = [p for p, _ in top]
 
-        # 3) RTT probing (parallelize could be added; here sequential with short timeout)
-        rtts = {}
-        for p in candidates:
-            rtts[p] = self.measure_rtt_ms(p)
+        # 3) RTT probing in parallel: wall time ~ the slowest probe (bounded by RTT_TIMEOUT)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(candidates)) as executor:
+            rtts = dict(zip(candidates, executor.map(self.measure_rtt_ms, candidates)))
 
         # 4) normalization
         # cost normalization among candidates (finite only)
-        cost_values = [c for p, c in filled_sorted[:top_k] if c != float("inf")]
+        cost_values = [c for p, c in top if c != float("inf")]
         if cost_values:
             cmin, cmax = min(cost_values), max(cost_values)
         else:
             cmin, cmax = 0.0, 1.0
+        cspan = cmax - cmin
 
         rvals = list(rtts.values())
         rmin, rmax = (min(rvals), max(rvals)) if rvals else (0.0, 1.0)
+        rspan = rmax - rmin
 
         scores = {}
-        for p in candidates:
+        # raw cost comes with the candidate: no dict(filled) rebuilt per peer
+        for p, raw_cost in top:
             # cost normalized
-            raw_cost = dict(filled).get(p, float("inf"))
             if raw_cost == float("inf"):
                 cn = 1.0  # worst
             else:
-                cn = 0.0 if cmax == cmin else (raw_cost - cmin) / (cmax - cmin)
+                cn = 0.0 if cspan == 0 else (raw_cost - cmin) / cspan
                 cn = max(0.0, min(1.0, cn))
             # rtt normalized
             raw_rtt = rtts.get(p, RTT_PENALTY)
-            rn = 0.0 if rmax == rmin else (raw_rtt - rmin) / (rmax - rmin)
+            rn = 0.0 if rspan == 0 else (raw_rtt - rmin) / rspan
             rn = max(0.0, min(1.0, rn))
             score = alpha * cn + beta * rn
             scores[p] = score
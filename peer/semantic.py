@@ -1,10 +1,19 @@
 #!/usr/bin/env python3
 import os
-import hashlib
-import requests
 import json
+import atexit
 import concurrent.futures
 from naive import NaivePeer
+from hashing import placement_hash
+
+try:
+    import orjson
+    _json_loads = orjson.loads  # Parses the raw bytes, no str decoding step
+except ImportError:
+    _json_loads = json.loads
+
+UPLOAD_WORKERS = 8  # Concurrent chunk sends to the primary node
+SEARCH_WORKERS = 32  # Broadcast fan-out; sized for the cluster, not the bootstrap peer list
 
 class SemanticPeer(NaivePeer):
     """
@@ -16,6 +25,13 @@ class SemanticPeer(NaivePeer):
     - Partition Key: Uses 'genre' to decide the responsible node.
     """
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Broadcast workers live as long as the peer: no thread spawn/teardown per search
+        self._search_pool = concurrent.futures.ThreadPoolExecutor(
+            max_workers=SEARCH_WORKERS, thread_name_prefix="sem-search")
+        atexit.register(self._search_pool.shutdown, wait=False)
+
     def upload_file(self, filepath, metadata=None, simulate_content=False):
         """
         Upload che forza la co-locazione dei dati.
@@ -29,31 +45,43 @@ class SemanticPeer(NaivePeer):
             partition_key = metadata.get("titolo", "").lower().strip() or "unknown"
         
         # Hash della chiave semantica (NON del contenuto del chunk!)
-        placement_hash = hashlib.sha1(partition_key.encode()).hexdigest()
-        primary_node = self.ring.get_node(placement_hash)
+        target_hash = placement_hash(partition_key)
+        primary_node = self.ring.get_node(target_hash)
         
         print(f"Placement: '{partition_key}' -> {primary_node}")
 
         # 2. File Split
         if simulate_content:
             size_mb = metadata.get("size_mb", 1)
-            chunks = list(self._generate_dummy_chunks(size_mb))
+            # Consumed lazily: one dummy chunk in memory at a time
+            chunks = self._generate_dummy_chunks(size_mb)
             # _generate_dummy_chunks is inherited from NaivePeer
         else:
             chunks = self.storage.split_file(filepath)
         
         chunks_info = []
+        # Every chunk lives on the same node: one peers list shared by all entries
+        # (only serialized here; peers are appended to manifests loaded from disk)
+        primary_peers = [primary_node]
+        is_local = primary_node == self.self_id
 
         # 3. Chunk Distribution (ALL TO THE SAME NODE)
         # We sacrifice storage load balancing for access speed.
-        for idx, ch_hash, data in chunks:
-            chunks_info.append({"hash": ch_hash, "peers": [primary_node]})
-            
-            # Physical transmission
-            if primary_node == self.self_id:
-                self.storage.save_chunk(ch_hash, data)
-            else:
-                self._send_chunk(primary_node, ch_hash, data)
+        # Remote sends are pipelined (up to UPLOAD_WORKERS in flight) so the link
+        # is not idle between round-trips; the backlog is bounded to limit memory.
+        with concurrent.futures.ThreadPoolExecutor(max_workers=UPLOAD_WORKERS) as executor:
+            pending = set()
+            for idx, ch_hash, data in chunks:
+                chunks_info.append({"hash": ch_hash, "peers": primary_peers})
+                
+                # Physical transmission
+                if is_local:
+                    self.storage.save_chunk(ch_hash, data)
+                else:
+                    if len(pending) >= 2 * UPLOAD_WORKERS:
+                        _, pending = concurrent.futures.wait(
+                            pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                    pending.add(executor.submit(self._send_chunk, primary_node, ch_hash, data))
 
         # 4. Manifest Creation
         manifest = {
@@ -85,7 +113,7 @@ class SemanticPeer(NaivePeer):
         # We can go directly (Direct Routing O(1))
         if "genre" in query:
             partition_key = query["genre"].lower().strip()
-            target_hash = hashlib.sha1(partition_key.encode()).hexdigest()
+            target_hash = placement_hash(partition_key)
             target_node = self.ring.get_node(target_hash)
             
             print(f"   -> Direct routing to node {target_node} (Key: {partition_key})")
@@ -97,17 +125,16 @@ class SemanticPeer(NaivePeer):
         print(f"   -> Broadcast Search (No Partition Key)")
         results = []
         
-        # Parallelize requests
-        with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
-            futures = {executor.submit(self._query_node, p, query): p for p in self.known_peers}
-            
-            for future in concurrent.futures.as_completed(futures):
-                try:
-                    res = future.result()
-                    results.extend(res)
-                except Exception:
-                    pass
+        # Parallelize requests (long-lived pool, pooled self.session connections)
+        futures = [self._search_pool.submit(self._query_node, p, query)
+                   for p in self.known_peers if not self._circuit_open(p)]
         
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                results.extend(future.result())
+            except Exception:
+                pass
+
         # Add local results too (self)
         local_res = self._search_local_storage(query) # Inherited method from NaivePeer
         results.extend(local_res)
@@ -140,14 +167,19 @@ class SemanticPeer(NaivePeer):
         """Queries a remote node (uses existing search_local API)"""
         if node == self.self_id:
             return self._search_local_storage(query)
+        if self._circuit_open(node):
+            return []  # Failed recently: don't tie up a worker until the timeout
         
         try:
             # Use local search endpoint that looks only in node's disk
-            r = requests.get(f"http://{node}/search_local", params=query, timeout=2)
+            r = self.session.get(f"http://{node}/search_local", params=query, timeout=2)
             if r.status_code == 200:
-                return r.json().get("results", [])
+                results = _json_loads(r.content).get("results", [])
+                self._record_result(node, True)
+                return results
         except Exception:
             pass
+        self._record_result(node, False)
         return []
 
     def _get_placement_key(self, manifest):
@@ -2,11 +2,155 @@
 import os
 import hashlib
 import json
+import logging
+import mmap
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+try:
+    import orjson
+    _json_loads = orjson.loads  # parser C sui bytes letti, ~3-5x più veloce di json
+except ImportError:
+    orjson = None
+    _json_loads = json.loads
+
+
+def _json_dumps(obj, indent=False):
+    """Serializza obj in un unico buffer bytes (orjson se disponibile)"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+    return json.dumps(obj, indent=2 if indent else None).encode()
+
+
+def _atomic_write(path, data):
+    """
+    Scrive data in path in modo atomico: file temporaneo (una sola write + fsync)
+    poi os.replace. Un crash a metà lascia il file precedente intatto, mai un
+    JSON troncato. Il temporaneo è per-thread: scritture concorrenti non si pestano.
+    """
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+log = logging.getLogger(__name__)
 
 # Dimensione di ogni chunk: 1 MB (1024 * 1024 bytes)
 # I file vengono suddivisi in pezzi di questa dimensione per la distribuzione
 CHUNK_SIZE = 1024 * 1024  # 1 MB
 
+# Hash dei chunk. hashlib.sha1 è già l'implementazione OpenSSL, che sceglie a
+# runtime (CPUID) il percorso SHA-NI / AVX2 quando la CPU lo supporta, e rilascia
+# il GIL sui buffer grandi: non serve un binding esterno (isal_crypto & co.).
+_sha1 = hashlib.sha1
+
+# Chunk letti in anticipo e hashati in parallelo da split_file
+HASH_BATCH = 8
+
+# Thread di hashing: uno per core. Bastano i thread (niente processi): OpenSSL
+# rilascia il GIL per tutto l'update di un chunk da 1 MB, quindi i core lavorano
+# davvero in parallelo senza copiare i dati tra processi.
+HASH_WORKERS = max(1, min(HASH_BATCH, os.cpu_count() or 1))
+
+# Thread che leggono i manifest in list_local_manifests (latenza disco, non CPU)
+MANIFEST_READERS = 16
+
+# Chunk aperti in anticipo da rebuild_file (richieste di lettura in coda al kernel)
+READ_AHEAD = 32
+
+
+@lru_cache(maxsize=4096)
+def _filename_hash(name):
+    """SHA-1 esadecimale del nome di un file (identificatore del suo manifest), memoizzato"""
+    return hashlib.sha1(name.encode()).hexdigest()
+
+
+@lru_cache(maxsize=4096)
+def _index_filename(sharded_key):
+    """
+    Nome file (idx_<md5>.json) della voce d'indice di una chiave shardata, memoizzato.
+    MD5 serve solo a ottenere un nome sicuro e stabile tra riavvii (i file
+    esistenti restano validi), non per sicurezza.
+    """
+    return f"idx_{hashlib.md5(sharded_key.encode(), usedforsecurity=False).hexdigest()}.json"
+
+
+def _chunk_digest(data):
+    """Hash esadecimale di un chunk (eseguito nei thread: OpenSSL rilascia il GIL)"""
+    return _sha1(data).hexdigest()
+
+
+def _open_prefetch(path):
+    """
+    Apre un chunk e chiede al kernel di iniziarne subito la lettura asincrona
+    (POSIX_FADV_WILLNEED). Ritorna il file aperto, o None se il chunk non c'è.
+    """
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return None
+    if hasattr(os, "posix_fadvise"):
+        try:
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_WILLNEED)
+        except OSError:
+            pass
+    return f
+
+
+def _verify_chunk(cf, ch_hash):
+    """
+    Verifica l'hash di un chunk aperto leggendolo via mmap: l'hash lavora
+    direttamente sulle pagine del page cache, senza copiarle in un bytes.
+    Ritorna la dimensione del chunk.
+    """
+    size = os.fstat(cf.fileno()).st_size
+    if size:
+        with mmap.mmap(cf.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            digest = _sha1(mm).hexdigest()
+    else:
+        digest = _sha1(b"").hexdigest()
+    if digest != ch_hash:
+        raise IOError(f"[Storage] Errore integrità chunk {ch_hash}: hash mismatch")
+    return size
+
+
+def _copy_chunk(cf, out, size):
+    """
+    Accoda size bytes di cf a out (non bufferizzato) restando nel kernel:
+    copy_file_range (stesso filesystem: copia in-kernel, reflink dove il FS lo
+    permette), poi sendfile, infine read/write in user space.
+    """
+    offset = 0
+    for copy in (getattr(os, "copy_file_range", None), getattr(os, "sendfile", None)):
+        if copy is None or offset >= size:
+            continue
+        try:
+            while offset < size:
+                if copy is os.sendfile:
+                    sent = os.sendfile(out.fileno(), cf.fileno(), offset, size - offset)
+                else:
+                    sent = copy(cf.fileno(), out.fileno(), size - offset, offset)
+                if sent == 0:
+                    break
+                offset += sent
+        except OSError:
+            # Es. EXDEV (filesystem diversi) o syscall non supportata: si passa oltre
+            pass
+    if offset < size:
+        # Fallback (o resto di una copia parziale) in user space
+        cf.seek(offset)
+        out.write(cf.read(size - offset))
+
 class Storage:
     """
     Classe per la gestione dello storage locale di un peer nel sistema BitTorrent distribuito.
@@ -33,6 +177,59 @@ class Storage:
         self.data_dir = data_dir
         # Crea la directory dati se non esiste già (exist_ok=True evita errori)
         os.makedirs(data_dir, exist_ok=True)
+        # Path dei manifest già calcolati: file_hash -> path (data_dir non cambia)
+        self._manifest_paths = {}
+        # Sottocartelle di shard dei chunk già create (evita makedirs ripetuti)
+        self._shard_dirs = set()
+        self._migrate_flat_chunks()
+        # Hash dei chunk presenti su disco: i controlli di esistenza (spesso
+        # negativi, es. peer appena entrato) non costano una syscall
+        self._present = self._scan_chunks()
+
+    def _migrate_flat_chunks(self):
+        """
+        Sposta nelle cartelle di shard i chunk salvati dalle versioni precedenti
+        direttamente in data_dir (una rename per chunk, solo la prima volta).
+        """
+        with os.scandir(self.data_dir) as it:
+            legacy = [e.name for e in it
+                      if len(e.name) == 40 and e.is_file(follow_symlinks=False)
+                      and all(c in "0123456789abcdef" for c in e.name)]
+        for name in legacy:
+            self._ensure_shard_dir(name)
+            os.replace(os.path.join(self.data_dir, name), self._chunk_filename(name))
+
+    def _scan_chunks(self):
+        """Legge una volta le cartelle di shard e ritorna l'insieme dei chunk presenti"""
+        present = set()
+        with os.scandir(self.data_dir) as it:
+            for e in it:
+                if len(e.name) == 2 and e.is_dir(follow_symlinks=False):
+                    self._shard_dirs.add(e.name)
+                    with os.scandir(e.path) as shard:
+                        present.update(c.name for c in shard if c.is_file(follow_symlinks=False))
+        return present
+
+    def has_chunk(self, chunk_hash):
+        """True se il chunk è salvato localmente (controllo in memoria, senza toccare il disco)"""
+        return chunk_hash in self._present
+
+    def _prefetch_chunk(self, chunk_hash):
+        """_open_prefetch del chunk, senza syscall se il chunk non risulta presente"""
+        if chunk_hash not in self._present:
+            return None
+        f = _open_prefetch(self._chunk_filename(chunk_hash))
+        if f is None:
+            # Rimosso da fuori (es. cartella ripulita a mano): allinea l'insieme
+            self._present.discard(chunk_hash)
+        return f
+
+    def _ensure_shard_dir(self, chunk_hash):
+        """Crea (una volta sola) la sottocartella di shard di un chunk"""
+        shard = chunk_hash[:2]
+        if shard not in self._shard_dirs:
+            os.makedirs(os.path.join(self.data_dir, shard), exist_ok=True)
+            self._shard_dirs.add(shard)
 
     def _chunk_filename(self, chunk_hash):
         """
@@ -40,6 +237,8 @@ class Storage:
         
         I chunk sono salvati con il loro hash SHA-1 come nome file.
         Questo permette di identificarli univocamente e verificarne l'integrità.
+        Come in git, sono ripartiti in 256 sottocartelle secondo i primi due
+        caratteri dell'hash: nessuna directory cresce fino a 10^5+ voci.
         
         Args:
             chunk_hash (str): Hash SHA-1 del chunk (40 caratteri esadecimali)
@@ -49,9 +248,9 @@ class Storage:
         
         Esempio:
             _chunk_filename("8b2d01bc0230a5558c363701c5e1fb2956ceafae")
-            -> "data_peer1/8b2d01bc0230a5558c363701c5e1fb2956ceafae"
+            -> "data_peer1/8b/8b2d01bc0230a5558c363701c5e1fb2956ceafae"
         """
-        return os.path.join(self.data_dir, chunk_hash)
+        return os.path.join(self.data_dir, chunk_hash[:2], chunk_hash)
 
     def _manifest_filename(self, file_hash):
         """
@@ -70,7 +269,10 @@ class Storage:
             _manifest_filename("a1b2c3d4...")
             -> "data_peer1/a1b2c3d4....manifest.json"
         """
-        return os.path.join(self.data_dir, f"{file_hash}.manifest.json")
+        path = self._manifest_paths.get(file_hash)
+        if path is None:
+            path = self._manifest_paths[file_hash] = os.path.join(self.data_dir, f"{file_hash}.manifest.json")
+        return path
 
     def split_file(self, filepath):
         """
@@ -99,18 +301,40 @@ class Storage:
         chunks = []
         # Apri il file in modalità binaria (rb = read binary)
         with open(filepath, "rb") as f:
-            idx = 0
-            while True:
-                # Leggi fino a CHUNK_SIZE bytes
-                data = f.read(CHUNK_SIZE)
-                # Se non ci sono più dati, esci dal loop
-                if not data:
-                    break
-                # Calcola l'hash SHA-1 del chunk
-                chunk_hash = hashlib.sha1(data).hexdigest()
-                # Aggiungi la tupla alla lista
-                chunks.append((idx, chunk_hash, data))
-                idx += 1
+            size = os.fstat(f.fileno()).st_size
+            # File vuoto: nessun chunk (e mmap non accetta lunghezza 0)
+            if not size:
+                return chunks
+            # Il file è mappato in memoria: gli hash leggono direttamente dal page
+            # cache tramite memoryview, senza un bytes intermedio per f.read()
+            # Lettura sequenziale: il kernel raddoppia il read-ahead e libera
+            # prima le pagine già consumate
+            if hasattr(os, "posix_fadvise"):
+                try:
+                    os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+                except OSError:
+                    pass
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, \
+                    memoryview(mm) as mv, \
+                    ThreadPoolExecutor(max_workers=HASH_WORKERS) as pool:
+                if hasattr(mm, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+                    mm.madvise(mmap.MADV_SEQUENTIAL)
+                step = HASH_BATCH * CHUNK_SIZE
+                for first in range(0, size, step):
+                    # Viste (zero-copy) su HASH_BATCH chunk da CHUNK_SIZE bytes
+                    batch = [mv[off:off + CHUNK_SIZE]
+                             for off in range(first, min(size, first + step), CHUNK_SIZE)]
+                    # Calcola gli hash SHA-1 del batch: i chunk sono indipendenti,
+                    # quindi un core per chunk (un solo chunk: niente thread)
+                    if len(batch) > 1 and HASH_WORKERS > 1:
+                        digests = pool.map(_chunk_digest, batch)
+                    else:
+                        digests = [_chunk_digest(view) for view in batch]
+                    # Aggiungi le tuple alla lista, nell'ordine del file: i dati
+                    # sono copiati una sola volta, e la vista rilasciata subito
+                    for view, chunk_hash in zip(batch, digests):
+                        chunks.append((len(chunks), chunk_hash, view.tobytes()))
+                        view.release()
         return chunks
 
     def save_chunk(self, chunk_hash, data):
@@ -129,11 +353,13 @@ class Storage:
         
         Esempio:
             save_chunk("8b2d01bc...", b"Hello World! ...")
-            # Crea file: data_peer1/8b2d01bc...
+            # Crea file: data_peer1/8b/8b2d01bc...
         """
+        self._ensure_shard_dir(chunk_hash)
         # wb = write binary
         with open(self._chunk_filename(chunk_hash), "wb") as f:
             f.write(data)
+        self._present.add(chunk_hash)
 
     def load_chunk(self, chunk_hash):
         """
@@ -154,13 +380,16 @@ class Storage:
             else:
                 print("Chunk non trovato")  # Devo scaricarlo da altri peer
         """
-        path = self._chunk_filename(chunk_hash)
-        # Controlla se il file esiste
-        if os.path.exists(path):
+        # Controlla se il chunk esiste (in memoria, niente os.path.exists)
+        if chunk_hash not in self._present:
+            return None
+        try:
             # rb = read binary
-            with open(path, "rb") as f:
+            with open(self._chunk_filename(chunk_hash), "rb") as f:
                 return f.read()
-        return None
+        except FileNotFoundError:
+            self._present.discard(chunk_hash)
+            return None
 
     def create_manifest(self, filename, chunks, peers_map, metadata=None):
         """
@@ -201,8 +430,9 @@ class Storage:
             manifest = create_manifest("test.txt", chunks, peers_map)
             # Il manifest traccia che hash1 è su peer1 e hash2 è su peer2
         """
-        # Ottieni la dimensione totale del file originale
-        total_size = os.path.getsize(filename)
+        # Dimensione totale del file originale: è la somma dei chunk, già in
+        # memoria (niente stat sul file)
+        total_size = sum(len(data) for _, _, data in chunks)
         
         manifest = {
             # Nome del file (solo basename, senza path)
@@ -244,11 +474,11 @@ class Storage:
             # Ritorna: file_hash per riferimenti futuri
         """
         # Calcola l'hash del nome file per usarlo come identificatore
-        file_hash = hashlib.sha1(manifest["filename"].encode()).hexdigest()
+        file_hash = _filename_hash(manifest["filename"])
         
-        # Salva il manifest in formato JSON leggibile (indent=2 per formattazione)
-        with open(self._manifest_filename(file_hash), "w") as f:
-            json.dump(manifest, f, indent=2)
+        # Salva il manifest in formato JSON leggibile (indent=2 per formattazione),
+        # in modo atomico: chi legge vede sempre il manifest vecchio o quello nuovo
+        _atomic_write(self._manifest_filename(file_hash), _json_dumps(manifest, indent=True))
         
         return file_hash
 
@@ -270,7 +500,7 @@ class Storage:
                 chunks = manifest["chunks"]  # Accedi ai chunk
         """
         # Calcola l'hash del filename per trovare il manifest
-        file_hash = hashlib.sha1(filename.encode()).hexdigest()
+        file_hash = _filename_hash(filename)
         path = self._manifest_filename(file_hash)
         
         # Controlla se il manifest esiste
@@ -307,20 +537,37 @@ class Storage:
             # Ora il manifest mostra che sia peer1 che peer3 hanno quel chunk
             # {"hash": "abc123...", "peers": ["peer1:5000", "peer3:5000"]}
         """
+        return self.update_manifest_with_peers(filename, [(chunk_hash, new_peer)])
+
+    def update_manifest_with_peers(self, filename, pairs):
+        """
+        Come update_manifest_with_peer, ma per più coppie (chunk_hash, peer) dello
+        stesso file: il manifest viene caricato e salvato una volta sola.
+
+        Returns:
+            bool: True se almeno un peer è stato aggiunto
+        """
         # Carica il manifest esistente
         manifest = self.load_manifest(filename)
         if not manifest:
             return False  # manifest non trovato
 
-        updated = False
-        # Cerca il chunk specifico nel manifest
+        # Indice hash -> chunk costruito una volta: ogni aggiornamento è O(1)
+        # invece di una scansione di tutti i chunk
+        by_hash = {}
         for chunk in manifest["chunks"]:
-            if chunk["hash"] == chunk_hash:
-                # Aggiungi il peer solo se non è già nella lista
-                if new_peer not in chunk["peers"]:
-                    chunk["peers"].append(new_peer)
-                    updated = True
-                break
+            by_hash.setdefault(chunk["hash"], chunk)
+
+        updated = False
+        for chunk_hash, new_peer in pairs:
+            chunk = by_hash.get(chunk_hash)
+            if chunk is None:
+                continue
+            # Aggiungi il peer solo se non è già nella lista
+            peers = chunk["peers"]
+            if new_peer not in peers:
+                peers.append(new_peer)
+                updated = True
 
         # Se ci sono state modifiche, salva il manifest aggiornato
         if updated:
@@ -342,21 +589,28 @@ class Storage:
             for manifest in manifests:
                 print(f"File: {manifest['filename']}")
         """
-        manifests = []
-        
-        # Scansiona tutti i file nella directory dati
-        for filename in os.listdir(self.data_dir):
-            # Cerca file con estensione .manifest.json
-            if filename.endswith('.manifest.json'):
-                manifest_path = os.path.join(self.data_dir, filename)
-                try:
-                    with open(manifest_path, 'r') as f:
-                        manifest = json.load(f)
-                        manifests.append(manifest)
-                except (json.JSONDecodeError, IOError) as e:
-                    print(f"Errore nel caricamento del manifest {filename}: {e}")
-        
-        return manifests
+        # Scansiona la directory dati (scandir: il tipo del file arriva con la
+        # voce stessa, senza uno stat in più) cercando file .manifest.json
+        with os.scandir(self.data_dir) as it:
+            entries = [e for e in it if e.name.endswith('.manifest.json') and e.is_file()]
+
+        def _load(entry):
+            try:
+                with open(entry.path, 'rb') as f:
+                    return _json_loads(f.read())
+            except (ValueError, IOError) as e:
+                print(f"Errore nel caricamento del manifest {entry.name}: {e}")
+                return None
+
+        # Le letture sono indipendenti: con molti manifest si sovrappongono le
+        # latenze del disco leggendoli in parallelo
+        if len(entries) > 1:
+            with ThreadPoolExecutor(max_workers=min(MANIFEST_READERS, len(entries))) as pool:
+                loaded = list(pool.map(_load, entries))
+        else:
+            loaded = [_load(e) for e in entries]
+
+        return [m for m in loaded if m is not None]
 
     def remove_local_manifest(self, filename):
         """
@@ -368,7 +622,7 @@ class Storage:
         Returns:
             bool: True se il manifest è stato rimosso, False se non esisteva
         """
-        file_hash = hashlib.sha1(filename.encode()).hexdigest()
+        file_hash = _filename_hash(filename)
         manifest_path = self._manifest_filename(file_hash)
         
         if os.path.exists(manifest_path):
@@ -395,30 +649,71 @@ class Storage:
         total_chunks = len(ordered_chunks)
         print(f"[Storage] Manifest con {total_chunks} chunk. CHUNK_SIZE={CHUNK_SIZE} bytes")
 
+        for i, ch in enumerate(ordered_chunks):
+            if not ch.get("hash"):
+                raise ValueError(f"[Storage] Chunk senza hash nella posizione {i}: {ch}")
+
+        # Il dettaglio per chunk va su logging a livello DEBUG: con il livello
+        # disattivato non si formatta né si scrive nulla per ogni chunk
+        debug = log.isEnabledFor(logging.DEBUG)
+
+        # Read-ahead: i prossimi READ_AHEAD chunk sono già aperti e il kernel li
+        # sta leggendo (WILLNEED), così il disco ha molte richieste in coda
+        # mentre qui si verifica e si scrive il chunk corrente.
+        prefetched = {}
+        for j in range(min(READ_AHEAD, total_chunks)):
+            prefetched[j] = self._prefetch_chunk(ordered_chunks[j]["hash"])
+
         written = 0
-        with open(output_path, "wb") as out:
-            for i, ch in enumerate(ordered_chunks):
-                ch_hash = ch.get("hash")
-                if not ch_hash:
-                    raise ValueError(f"[Storage] Chunk senza hash nella posizione {i}: {ch}")
-
-                chunk_path = self._chunk_filename(ch_hash)
-                exists = os.path.exists(chunk_path)
-                print(f"[Storage] [{i+1}/{total_chunks}] hash={ch_hash} path={chunk_path} exists={exists}")
-
-                if not exists:
-                    # Fornisce informazioni aggiuntive prima di fallire
-                    peers = ch.get("peers", [])
-                    raise FileNotFoundError(f"[Storage] Chunk mancante: {ch_hash} (index {i}). Peers noti: {peers}")
-
-                # Carica e scrive il chunk
-                with open(chunk_path, "rb") as cf:
-                    data = cf.read()
-                    if hashlib.sha1(data).hexdigest() != ch_hash:
-                        raise IOError(f"[Storage] Errore integrità chunk {ch_hash}: hash mismatch")
-                    out.write(data)
-                    written += len(data)
-                    print(f"[Storage] [{i+1}/{total_chunks}] scritto {len(data)} bytes, totale scritto {written} bytes")
+        batch = []
+        try:
+            # Output non bufferizzato: i chunk ci arrivano via sendfile sul suo fd
+            with open(output_path, "wb", buffering=0) as out, \
+                    ThreadPoolExecutor(max_workers=HASH_WORKERS) as pool:
+                # I chunk si verificano a gruppi di HASH_BATCH: gli hash del gruppo
+                # girano in parallelo (OpenSSL rilascia il GIL), poi si scrive in ordine
+                for first in range(0, total_chunks, HASH_BATCH):
+                    batch = []
+                    for i in range(first, min(first + HASH_BATCH, total_chunks)):
+                        ch = ordered_chunks[i]
+                        cf = prefetched.pop(i)
+                        if i + READ_AHEAD < total_chunks:
+                            prefetched[i + READ_AHEAD] = self._prefetch_chunk(ordered_chunks[i + READ_AHEAD]["hash"])
+
+                        if debug:
+                            log.debug("[Storage] [%d/%d] hash=%s path=%s exists=%s", i + 1, total_chunks,
+                                      ch["hash"], self._chunk_filename(ch["hash"]), cf is not None)
+
+                        if cf is None:
+                            # Fornisce informazioni aggiuntive prima di fallire
+                            peers = ch.get("peers", [])
+                            raise FileNotFoundError(f"[Storage] Chunk mancante: {ch['hash']} (index {i}). Peers noti: {peers}")
+                        batch.append(cf)
+
+                    # Verifica il gruppo senza portare i chunk in bytes Python:
+                    # hash via mmap sulle pagine già lette (il primo errore, in
+                    # ordine, interrompe il rebuild come prima)
+                    hashes = [ch["hash"] for ch in ordered_chunks[first:first + len(batch)]]
+                    if len(batch) > 1 and HASH_WORKERS > 1:
+                        sizes = list(pool.map(_verify_chunk, batch, hashes))
+                    else:
+                        sizes = [_verify_chunk(cf, h) for cf, h in zip(batch, hashes)]
+
+                    # Scrive il gruppo in ordine, copiando nel kernel (sendfile)
+                    for i, (cf, size) in enumerate(zip(batch, sizes), start=first):
+                        with cf:
+                            _copy_chunk(cf, out, size)
+                        written += size
+                        if debug:
+                            log.debug("[Storage] [%d/%d] scritto %d bytes, totale scritto %d bytes",
+                                      i + 1, total_chunks, size, written)
+                    batch = []
+        finally:
+            for cf in batch:
+                cf.close()
+            for cf in prefetched.values():
+                if cf is not None:
+                    cf.close()
 
         print(f"[Storage] Rebuild completato: {output_path} ({written} bytes scritti)")
         return output_path
@@ -430,8 +725,7 @@ class Storage:
         manifest_summary: dati essenziali del file (filename, metadata, host)
         """
         # Sanitizza il nome file per evitare caratteri illegali
-        safe_name = hashlib.md5(sharded_key.encode()).hexdigest()
-        path = os.path.join(self.data_dir, f"idx_{safe_name}.json")
+        path = os.path.join(self.data_dir, _index_filename(sharded_key))
         
         entries = []
         # Carica esistente
@@ -449,14 +743,12 @@ class Storage:
 
         entries.append(manifest_summary)
         
-        # Scrivi su disco (Atomico sarebbe meglio, ma ok per ora)
-        with open(path, 'w') as f:
-            json.dump(entries, f)
+        # Scrivi su disco in modo atomico (temporaneo + rename)
+        _atomic_write(path, _json_dumps(entries))
 
     def get_index_entries(self, sharded_key):
         """Legge l'indice locale per una specifica chiave shardata"""
-        safe_name = hashlib.md5(sharded_key.encode()).hexdigest()
-        path = os.path.join(self.data_dir, f"idx_{safe_name}.json")
+        path = os.path.join(self.data_dir, _index_filename(sharded_key))
         
         if os.path.exists(path):
             try:
@@ -479,21 +771,39 @@ class Storage:
             "total_files": 0
         }
         
+        total = manifests = indexes = chunks = chunks_bytes = 0
         try:
-            for f in os.listdir(self.data_dir):
-                path = os.path.join(self.data_dir, f)
-                if os.path.isfile(path):
-                    stats["total_files"] += 1
-                    size = os.path.getsize(path)
-                    
-                    if f.endswith(".manifest.json"):
-                        stats["manifests_count"] += 1
-                    elif f.startswith("idx_"):
-                        stats["indexes_count"] += 1
-                    elif len(f) == 40: # Sha1 hash (Chunk)
-                        stats["chunks_count"] += 1
-                        stats["chunks_bytes"] += size
+            # scandir: tipo e stat arrivano dalla DirEntry, senza isfile + getsize per file
+            with os.scandir(self.data_dir) as it:
+                for e in it:
+                    if len(e.name) == 2 and e.is_dir(follow_symlinks=False):
+                        # Cartella di shard: contiene solo chunk
+                        with os.scandir(e.path) as shard:
+                            for c in shard:
+                                if c.is_file(follow_symlinks=False):
+                                    total += 1
+                                    if len(c.name) == 40: # Sha1 hash (Chunk)
+                                        chunks += 1
+                                        chunks_bytes += c.stat(follow_symlinks=False).st_size
+                        continue
+                    if not e.is_file(follow_symlinks=False):
+                        continue
+                    total += 1
+                    name = e.name
+                    if name.endswith(".manifest.json"):
+                        manifests += 1
+                    elif name.startswith("idx_"):
+                        indexes += 1
+                    elif len(name) == 40: # Sha1 hash (Chunk)
+                        chunks += 1
+                        # La dimensione serve solo per i chunk
+                        chunks_bytes += e.stat(follow_symlinks=False).st_size
         except Exception:
             pass
-            
+
+        stats["total_files"] = total
+        stats["manifests_count"] = manifests
+        stats["indexes_count"] = indexes
+        stats["chunks_count"] = chunks
+        stats["chunks_bytes"] = chunks_bytes
         return stats
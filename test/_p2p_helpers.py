@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""Helpers shared by the end-to-end scripts (test_system.py, test_system_metadata.py, test_healing.py)."""
+import os
+import asyncio
+import hashlib
+import json
+import mmap
+import subprocess
+import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import httpx
+except ImportError:
+    httpx = None  # Optional: without httpx manifest sweeps use a thread pool
+
+try:
+    import orjson
+    _json_dumps = orjson.dumps  # Serializes straight to bytes for the request body
+    _json_loads = orjson.loads  # Parses the raw response bytes
+except ImportError:
+    _json_dumps = lambda obj: json.dumps(obj).encode()
+    _json_loads = json.loads
+
+try:
+    from blake3 import blake3
+    # Both sides of a comparison are hashed here, so any digest works:
+    # BLAKE3 is SIMD-vectorized and hashes one file on several threads
+    HASH_NAME = "BLAKE3"
+except ImportError:
+    blake3 = None
+    HASH_NAME = "SHA1"
+
+# Seconds docker stop waits for a graceful exit before killing the container
+DOCKER_STOP_TIMEOUT = 10
+
+_docker_client = None
+_docker_checked = False
+_docker_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="docker")
+
+PEERS = [
+    "localhost:5001",
+    "localhost:5002",
+    "localhost:5003",
+    "localhost:5004",
+    "localhost:5005",
+    "localhost:5006",
+    "localhost:5007"
+]
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+# One keep-alive session for every call: each peer's TCP connection is reused
+SESSION = requests.Session()
+SESSION.mount("http://", HTTPAdapter(pool_connections=len(PEERS), pool_maxsize=32))
+SESSION.headers.update({"Connection": "keep-alive"})
+
+
+def hash_file(path):
+    if blake3 is not None:
+        return blake3(max_threads=blake3.AUTO).update_mmap(path).hexdigest()
+    with open(path, "rb") as f:
+        if hasattr(hashlib, "file_digest"):
+            # Python 3.11+: the read loop runs inside hashlib on OpenSSL's SHA-1
+            return hashlib.file_digest(f, "sha1").hexdigest()
+        sha = hashlib.sha1()
+        if os.fstat(f.fileno()).st_size:  # mmap refuses empty files
+            # One update over the mapped file: no per-chunk read syscalls or bytes copies
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                sha.update(mm)
+    return sha.hexdigest()
+
+
+def _docker():
+    """Docker SDK client, created on first use (importers that never touch containers
+    open no daemon connection); None when the SDK is missing or the daemon unreachable."""
+    global _docker_client, _docker_checked
+    if not _docker_checked:
+        _docker_checked = True
+        try:
+            import docker
+            # One client over the daemon socket instead of spawning the docker CLI each time
+            _docker_client = docker.from_env()
+        except Exception:
+            _docker_client = None  # Fall back to the CLI
+    return _docker_client
+
+
+def docker_async(action, container_name):
+    """Runs `docker <action> <container>` (stop/start) without blocking.
+    Returns a wait(timeout) callable: SDK errors are re-raised to the caller (a wait
+    past the timeout raises TimeoutError), a CLI call still running is killed."""
+    client = _docker()
+    if client is not None:
+        def run():
+            container = client.containers.get(container_name)
+            if action == "stop":
+                return container.stop(timeout=DOCKER_STOP_TIMEOUT)
+            return getattr(container, action)()
+        fut = _docker_pool.submit(run)
+        return lambda timeout=None: fut.result(timeout)
+    proc = subprocess.Popen(["docker", action, container_name],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    def wait(timeout=None):
+        try:
+            return proc.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            return proc.wait()
+    return wait
+
+
+async def _manifest_sweep_async(peers, filename, timeout):
+    """All get_manifest requests in flight at once on one event loop (httpx)."""
+    async with httpx.AsyncClient(timeout=timeout) as client:
+        responses = await asyncio.gather(
+            *(client.get(f"http://{p}/get_manifest/{filename}") for p in peers),
+            return_exceptions=True)
+    return [p for p, r in zip(peers, responses)
+            if not isinstance(r, Exception) and r.status_code == 200]
+
+
+def manifest_holders(peers, filename, timeout=1.0):
+    """Peers (in the given order) currently serving the manifest of filename.
+    Every peer is asked in parallel: a dead node costs one timeout per sweep."""
+    peers = list(peers)
+    if httpx is not None:
+        return asyncio.run(_manifest_sweep_async(peers, filename, timeout))
+
+    def has_manifest(p):
+        try:
+            return SESSION.get(f"http://{p}/get_manifest/{filename}", timeout=timeout).status_code == 200
+        except Exception:
+            return False
+
+    with ThreadPoolExecutor(max_workers=len(peers)) as executor:
+        return [p for p, ok in zip(peers, executor.map(has_manifest, peers)) if ok]
@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 import hashlib
 import bisect
+import itertools
 import random
 
 # --- Mocks ---
@@ -8,45 +9,52 @@ import random
 class MockRing:
     def __init__(self, nodes, replicas=3):
         self.replicas = replicas
-        self.ring = {}
-        self.sorted_keys = []
-        for node in nodes:
-            self.add_node(node)
+        # Build the whole ring in one pass and sort it once
+        self.ring = {self._vnode_hash(node, i): node
+                     for node in nodes for i in range(replicas)}
+        self.sorted_keys = sorted(self.ring)
+        self._reindex()
+
+    @staticmethod
+    def _vnode_hash(node, i):
+        return hashlib.sha1(f"{node}:{i}".encode()).hexdigest()
+
+    def _reindex(self):
+        # Owner of each sorted key, by position: lookups index a list, no dict hop
+        self._nodes = [self.ring[h] for h in self.sorted_keys]
 
     def add_node(self, node):
         for i in range(self.replicas):
-            key = f"{node}:{i}"
-            h = hashlib.sha1(key.encode()).hexdigest()
+            h = self._vnode_hash(node, i)
+            if h not in self.ring:
+                bisect.insort(self.sorted_keys, h)
             self.ring[h] = node
-            self.sorted_keys.append(h)
-        self.sorted_keys.sort()
+        self._reindex()
 
     def remove_node(self, node):
         keys_to_remove = [k for k, v in self.ring.items() if v == node]
         for k in keys_to_remove:
             del self.ring[k]
             self.sorted_keys.remove(k)
+        self._reindex()
 
     def get_node(self, key_hash):
         if not self.ring: return None
         idx = bisect.bisect(self.sorted_keys, key_hash)
-        if idx == len(self.sorted_keys): idx = 0
-        return self.ring[self.sorted_keys[idx]]
+        return self._nodes[idx % len(self._nodes)]
 
     def get_successors(self, key_hash, count=2):
-        if not self.ring: return []
+        if not self.ring or count <= 0: return []
+        nodes = self._nodes
+        total_virtual = len(nodes)
         idx = bisect.bisect(self.sorted_keys, key_hash)
         unique_nodes = []
-        attempts = 0
-        total_virtual = len(self.sorted_keys)
-        
-        while len(unique_nodes) < count and attempts < total_virtual:
-            if idx == len(self.sorted_keys): idx = 0
-            node = self.ring[self.sorted_keys[idx]]
+        # Walk the ring once starting at idx (wrapping around)
+        for node in itertools.islice(itertools.chain(nodes[idx:], nodes[:idx]), total_virtual):
             if node not in unique_nodes:
                 unique_nodes.append(node)
-            idx += 1
-            attempts += 1
+                if len(unique_nodes) == count:
+                    break
         return unique_nodes
 
 class MockPeer:
@@ -13,31 +13,59 @@ Questo script testa:
 import requests
 import time
 import json
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeout
+from requests.adapters import HTTPAdapter
 
 # Configurazione peer
 PEER1_URL = "http://localhost:5001"
 PEER2_URL = "http://localhost:5002" 
 PEER3_URL = "http://localhost:5003"
 
+# Sessione condivisa (keep-alive): i controlli sui peer riusano le connessioni
+SESSION = requests.Session()
+SESSION.mount("http://", HTTPAdapter(pool_connections=16, pool_maxsize=16))
+
+# Tempo massimo di una scansione dei manifest: i peer sani rispondono ben prima
+MANIFEST_SWEEP_DEADLINE = 1.5
+
+def _fan_out(func, peers, deadline=None):
+    """Esegue func(peer_name, url) su tutti i peer in parallelo: un peer giù costa
+    un solo timeout, non uno per peer. I risultati restano nell'ordine dei peer.
+    Con deadline la scansione finisce appena tutti rispondono o allo scadere
+    (chi non ha risposto vale None)."""
+    executor = ThreadPoolExecutor(max_workers=len(peers))
+    futures = {executor.submit(func, name, url): name for name, url in peers.items()}
+    results = {}
+    try:
+        for future in as_completed(futures, timeout=deadline):
+            results[futures[future]] = future.result()
+    except FuturesTimeout:
+        pending = [name for name in peers if name not in results]
+        print(f"Nessuna risposta entro {deadline}s da: {pending}")
+    finally:
+        # Non si aspettano i ritardatari: le loro richieste finiscono in background
+        executor.shutdown(wait=False, cancel_futures=True)
+    return [results.get(name) for name in peers]
+
 def test_peer_connectivity():
     """Testa se tutti i peer sono online"""
     print("Testando connettività dei peer...")
     
     peers = {"peer1": PEER1_URL, "peer2": PEER2_URL, "peer3": PEER3_URL}
-    online_peers = {}
     
-    for peer_name, url in peers.items():
+    def probe(peer_name, url):
         try:
-            response = requests.get(f"{url}/ping", timeout=3)
+            response = SESSION.get(f"{url}/ping", timeout=3)
             if response.status_code == 200:
                 print(f"{peer_name} è online")
-                online_peers[peer_name] = url
-            else:
-                print(f"{peer_name} risponde ma con errore: {response.status_code}")
+                return True
+            print(f"{peer_name} risponde ma con errore: {response.status_code}")
         except Exception as e:
             print(f"{peer_name} non raggiungibile: {e}")
+        return False
     
-    return online_peers
+    online = _fan_out(probe, peers)
+    return {name: url for (name, url), ok in zip(peers.items(), online) if ok}
 
 def upload_test_file(peer_url, filename):
     """Carica un file tramite un peer"""
@@ -69,24 +97,23 @@ def check_manifest_location(filename):
     print(f"Cercando manifest per '{filename}'...")
     
     peers = {"peer1": PEER1_URL, "peer2": PEER2_URL, "peer3": PEER3_URL}
-    manifest_locations = []
     
-    for peer_name, url in peers.items():
+    def lookup(peer_name, url):
         try:
-            response = requests.get(f"{url}/get_manifest/{filename}", timeout=3)
+            response = SESSION.get(f"{url}/get_manifest/{filename}", timeout=3)
             if response.status_code == 200:
-                manifest = response.json()
-                manifest_locations.append({
+                print(f"Manifest trovato su {peer_name}")
+                return {
                     "peer": peer_name,
                     "url": url,
-                    "manifest": manifest
-                })
-                print(f"Manifest trovato su {peer_name}")
+                    "manifest": response.json()
+                }
         except Exception as e:
             # Normal - manifest potrebbe non essere su questo peer
             pass
+        return None
     
-    return manifest_locations
+    return [loc for loc in _fan_out(lookup, peers, deadline=MANIFEST_SWEEP_DEADLINE) if loc]
 
 def perform_graceful_shutdown(peer_url, peer_name):
     """Esegue graceful shutdown di un peer"""
@@ -174,9 +201,15 @@ def main():
         return
     print()
     
-    # 5. Attendi un momento per la propagazione
-    print("Attendo 3 secondi per la propagazione...")
-    time.sleep(3)
+    # 5. Attendi la propagazione: si esce appena il manifest compare su un peer
+    # che prima non lo aveva (ridistribuzione avvenuta), al massimo 3s
+    print("Attendo la propagazione (al massimo 3 secondi)...")
+    holders_before = {loc["peer"] for loc in manifest_locations_before}
+    deadline = time.monotonic() + 3
+    while time.monotonic() < deadline:
+        if {loc["peer"] for loc in check_manifest_location(filename)} - holders_before:
+            break
+        time.sleep(0.5)
     print()
     
     # 6. Verifica posizione manifest dopo il shutdown
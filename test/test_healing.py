@@ -1,38 +1,32 @@
 #!/usr/bin/env python3
 import requests
 import time
-import subprocess
 import json
 import sys
+from _p2p_helpers import docker_async, manifest_holders
 
 # Configurazione
 PEERS = [f"localhost:{5001 + i}" for i in range(7)]
 FILE_NAME = "healing_test_doc.txt"
+# Indirizzo -> container Docker (localhost:5002 -> peer2), calcolato una volta sola
+PEER_CONTAINER = {p: f"peer{int(p.split(':')[1]) - 5000}" for p in PEERS}
 
 def get_manifest_locations(filename):
     """Chiede a tutti i peer chi ha il manifest del file"""
-    locations = []
     print(f"Scansione rete per '{filename}'...")
-    for p in PEERS:
-        try:
-            # Timeout breve, se un nodo è giù non deve bloccarci
-            r = requests.get(f"http://{p}/get_manifest/{filename}", timeout=1)
-            if r.status_code == 200:
-                locations.append(p)
-        except:
-            pass
-    return locations
+    # Tutti i peer in parallelo: un nodo giù costa al massimo 1s per scansione
+    return manifest_holders(PEERS, filename, timeout=1.0)
 
 def kill_peer(peer_addr):
-    """Uccide il container Docker associato a un indirizzo (es. localhost:5002 -> peer2)"""
-    # Ricaviamo il nome del container dalla porta
-    port = int(peer_addr.split(":")[1])
-    peer_num = port - 5000
-    container_name = f"peer{peer_num}"
+    """
+    Uccide il container Docker associato a un indirizzo (es. localhost:5002 -> peer2).
+    Non attende la fine di `docker stop` (anche ~10s): ritorna il nome del container
+    e la funzione wait, così il polling del self-healing parte subito.
+    """
+    container_name = PEER_CONTAINER[peer_addr]
     
     print(f"Killing {container_name} ({peer_addr})...")
-    subprocess.run(f"docker stop {container_name}", shell=True, stdout=subprocess.DEVNULL)
-    return container_name
+    return container_name, docker_async("stop", container_name)
 
 def main():
     print("=== TEST: ANTI-ENTROPY & SELF HEALING ===")
@@ -75,7 +69,7 @@ def main():
 
     # 4. Sabotaggio
     print(f"Simulazione Guasto su {victim}...")
-    container_name = kill_peer(victim)
+    container_name, wait_stop = kill_peer(victim)
     
     # Rimuoviamo la vittima dalla lista PEERS per non interrogarla più
     if victim in PEERS: PEERS.remove(victim)
@@ -91,10 +85,20 @@ def main():
     healed = False
     new_nodes = set()
     locs_final = []
+    # Polling adattivo: parte da 0.5s (i repair veloci si vedono subito) e
+    # rallenta fino a 5s finché non cambia nulla
+    interval = 0.5
+    last_locs = None
+    # Il progresso con '\r' ha senso solo su terminale: nei log CI diventerebbe una riga per giro
+    show_progress = sys.stdout.isatty()
+    last_progress = None
 
     while time.time() - start_time < max_wait:
         elasped = int(time.time() - start_time)
-        print(f"Attesa Self-Healing ({elasped}s)...", end="\r")
+        if show_progress and (last_progress is None or elasped - last_progress >= 2):
+            sys.stdout.write(f"\rAttesa Self-Healing ({elasped}s)...")
+            sys.stdout.flush()
+            last_progress = elasped
         
         current_locs = get_manifest_locations(FILE_NAME)
         # Filtra la vittima se risponde ancora (caching?)
@@ -111,7 +115,12 @@ def main():
             locs_final = current_locs
             break
         
-        time.sleep(5)
+        # Le repliche si stanno muovendo: si torna a controllare spesso
+        if current_locs != last_locs:
+            interval = 0.5
+        last_locs = current_locs
+        time.sleep(interval)
+        interval = min(interval * 1.5, 5.0)
 
     print("\n")
     
@@ -131,7 +140,8 @@ def main():
 
     # Cleanup: riavvia il nodo morto per non rompere altri test
     print(f"\n Riavvio {container_name} per pulizia...")
-    subprocess.run(f"docker start {container_name}", shell=True, stdout=subprocess.DEVNULL)
+    wait_stop(timeout=30)
+    docker_async("start", container_name)(timeout=30)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -6,14 +6,19 @@ from unittest.mock import MagicMock, patch
 # Add parent dir to path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+# Real interfaces used as mock specs: a misspelled or removed method raises
+# AttributeError instead of silently returning yet another MagicMock
+from peer.storage import Storage
+from peer.hashing import ConsistentHashRing
+
 # Mock dependencies
 sys.modules['requests'] = MagicMock()
 
 # Create Dummy Base Peer
 class DummyBasePeer:
     def __init__(self, *args, **kwargs):
-        self.storage = MagicMock()
-        self.ring = MagicMock()
+        self.storage = MagicMock(spec=Storage)
+        self.ring = MagicMock(spec=ConsistentHashRing)
         self.self_id = args[0] if len(args) > 0 else "peer:50000"
         self.known_peers = args[1] if len(args) > 1 else []
         
@@ -62,7 +67,9 @@ class TestPartialSearch(unittest.TestCase):
                 # Raises Timeout/Error
                 raise Exception("Network Timeout")
         
-        self.mock_requests.get.side_effect = side_effect
+        # NaivePeer floods through its own session: inject the mocked one
+        p.session = MagicMock()
+        p.session.get.side_effect = side_effect
         
         # Execute Search
         response = p.search({"q": "test"})
@@ -6,6 +6,10 @@ from unittest.mock import MagicMock, patch
 # Add parent dir to path to allow importing peer modules
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+# Specs for the storage/ring mocks below
+from peer.storage import Storage
+from peer.hashing import ConsistentHashRing
+
 # Mock dependencies before importing NaivePeer
 sys.modules['requests'] = MagicMock()
 sys.modules['base'] = MagicMock()
@@ -13,8 +17,8 @@ sys.modules['base'] = MagicMock()
 # Create a dummy base class
 class DummyBasePeer:
     def __init__(self, *args, **kwargs):
-        self.storage = MagicMock()
-        self.ring = MagicMock()
+        self.storage = MagicMock(spec=Storage)
+        self.ring = MagicMock(spec=ConsistentHashRing)
         self.self_id = args[0] if args else "peer:50000"
         self.known_peers = []
 
@@ -24,10 +28,48 @@ sys.modules['base'].BasePeer = DummyBasePeer
 
 import peer.naive as naive_module
 
+# Scenario fixtures, built once at import: _resolve_conflicts only reads them
+
+# 1 file, 1 version
+NO_CONFLICT = [{
+    "filename": "A.txt", 
+    "host": "peer1:5000", 
+    "updated_at": 100,
+    "manifest": {"filename": "A.txt", "updated_at": 100}
+}]
+
+# Remote version newer than another remote version
+CONFLICT_REMOTE_NEWER = [
+    {
+        "filename": "A.txt", 
+        "host": "peer1:5000", 
+        "updated_at": 100, # OLD
+        "manifest": {"id": "v1"} 
+    },
+    {
+        "filename": "A.txt", 
+        "host": "peer2:5000", 
+        "updated_at": 200, # NEW
+        "manifest": {"id": "v2"}
+    }
+]
+
+# Multiple files, some with conflicts
+CONFLICT_MULTIPLE_FILES = [
+    # File A: No conflict
+    {"filename": "A.txt", "host": "p1", "updated_at": 10, "manifest": {}},
+    
+    # File B: Conflict (p3 wins)
+    {"filename": "B.txt", "host": "p2", "updated_at": 10, "manifest": {}}, 
+    {"filename": "B.txt", "host": "p3", "updated_at": 20, "manifest": {"winner": True}}
+]
+
 class TestReadRepair(unittest.TestCase):
-    def setUp(self):
-        # Instantiate NaivePeer (it will use DummyBasePeer)
-        self.peer = naive_module.NaivePeer(
+    @classmethod
+    def setUpClass(cls):
+        # Instantiate NaivePeer once (it will use DummyBasePeer):
+        # _resolve_conflicts keeps no state between calls
+        cls.peer = naive_module.NaivePeer(
             self_id="test_node:5000", 
             known_peers=[], 
             isp="isp", 
@@ -36,18 +78,15 @@ class TestReadRepair(unittest.TestCase):
         
         # Mock _send_manifest to track repairs
         # Since _send_manifest is defined in NaivePeer, we can mock it on the instance
-        self.peer._send_manifest = MagicMock()
+        cls.peer._send_manifest = MagicMock()
+
+    def setUp(self):
+        # Fresh call history for every scenario
+        self.peer._send_manifest.reset_mock()
 
     def test_no_conflict(self):
         """Scenario: 1 file, 1 version. No repair needed."""
-        results = [{
-            "filename": "A.txt", 
-            "host": "peer1:5000", 
-            "updated_at": 100,
-            "manifest": {"filename": "A.txt", "updated_at": 100}
-        }]
-        
-        resolved = self.peer._resolve_conflicts(results)
+        resolved = self.peer._resolve_conflicts(NO_CONFLICT)
         
         self.assertEqual(len(resolved), 1)
         self.assertEqual(resolved[0]["host"], "peer1:5000")
@@ -55,22 +94,7 @@ class TestReadRepair(unittest.TestCase):
 
     def test_conflict_remote_newer(self):
         """Scenario: Remote version is newer than another remote version."""
-        results = [
-            {
-                "filename": "A.txt", 
-                "host": "peer1:5000", 
-                "updated_at": 100, # OLD
-                "manifest": {"id": "v1"} 
-            },
-            {
-                "filename": "A.txt", 
-                "host": "peer2:5000", 
-                "updated_at": 200, # NEW
-                "manifest": {"id": "v2"}
-            }
-        ]
-        
-        resolved = self.peer._resolve_conflicts(results)
+        resolved = self.peer._resolve_conflicts(CONFLICT_REMOTE_NEWER)
         
         # Should return only the winner
         self.assertEqual(len(resolved), 1)
@@ -83,22 +107,20 @@ class TestReadRepair(unittest.TestCase):
 
     def test_conflict_multiple_files(self):
         """Scenario: Multiple files, some with conflicts."""
-        results = [
-            # File A: No conflict
-            {"filename": "A.txt", "host": "p1", "updated_at": 10, "manifest": {}},
-            
-            # File B: Conflict (p3 wins)
-            {"filename": "B.txt", "host": "p2", "updated_at": 10, "manifest": {}}, 
-            {"filename": "B.txt", "host": "p3", "updated_at": 20, "manifest": {"winner": True}}
-        ]
-        
-        resolved = self.peer._resolve_conflicts(results)
+        resolved = self.peer._resolve_conflicts(CONFLICT_MULTIPLE_FILES)
         
         self.assertEqual(len(resolved), 2) # A and B
         
-        # Check B winner
-        b_res = next(r for r in resolved if r["filename"] == "B.txt")
-        self.assertEqual(b_res["host"], "p3")
+        # Group by filename in one pass (no per-file scan of resolved)
+        by_file = {}
+        for r in resolved:
+            by_file.setdefault(r["filename"], []).append(r)
+        self.assertEqual(sorted(by_file), ["A.txt", "B.txt"])
+        
+        # Check winners: one entry per file
+        self.assertEqual(len(by_file["B.txt"]), 1)
+        self.assertEqual(by_file["B.txt"][0]["host"], "p3")
+        self.assertEqual(by_file["A.txt"][0]["host"], "p1")
         
         # Check Repair
         self.peer._send_manifest.assert_called_once_with("p2", {"winner": True})
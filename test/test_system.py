@@ -1,49 +1,41 @@
 #!/usr/bin/env python3
 import os
-import requests
-import hashlib
 import time
-import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from _p2p_helpers import (PEERS, SESSION, JSON_HEADERS, HASH_NAME, hash_file, docker_async,
+                          _json_dumps, _json_loads)
 
 # -------------------------------------------------------------------
 # CONFIGURATION
 # -------------------------------------------------------------------
-PEERS = [
-    "localhost:5001",
-    "localhost:5002",
-    "localhost:5003",
-    "localhost:5004",
-    "localhost:5005",
-    "localhost:5006",
-    "localhost:5007"
-]
-
 FILE_TO_UPLOAD = "test_file_large.txt"
 
 # -------------------------------------------------------------------
 # UTILITY FUNCTIONS
 # -------------------------------------------------------------------
-def hash_file(path):
-    sha = hashlib.sha1()
-    with open(path, "rb") as f:
-        while chunk := f.read(1024 * 1024):
-            sha.update(chunk)
-    return sha.hexdigest()
+# (path, mtime_ns, size) -> digest: the original is hashed once per run, not per check
+_HASH_CACHE = {}
+
+def hash_file_cached(path):
+    st = os.stat(path)
+    key = (path, st.st_mtime_ns, st.st_size)
+    if key not in _HASH_CACHE:
+        _HASH_CACHE[key] = hash_file(path)
+    return _HASH_CACHE[key]
 
 
 def upload_file(peer_url, filename, metadata=None):
     print(f"\n[UPLOAD] Starting upload to {peer_url} of file '{filename}'")
-    start = time.time()
-    internal_path = f"/app/data/{os.path.basename(filename)}"
-    payload = {"filename": internal_path}
+    payload = {"filename": f"/app/data/{os.path.basename(filename)}"}
     if metadata:
         payload["metadata"] = metadata
-    r = requests.post(f"http://{peer_url}/store_file", json=payload)
+    start = time.time()
+    r = SESSION.post(f"http://{peer_url}/store_file", data=_json_dumps(payload), headers=JSON_HEADERS)
     elapsed = time.time() - start
 
     if r.status_code == 200:
         print(f"Upload completed in {elapsed:.2f}s")
-        return r.json(), elapsed
+        return _json_loads(r.content), elapsed
     else:
         print(f"Upload error: {r.status_code} - {r.text}")
         return None, elapsed
@@ -51,12 +43,14 @@ def upload_file(peer_url, filename, metadata=None):
 
 def download_file(peer_url, filename):
     print(f"\n[DOWNLOAD] Starting download from {peer_url} of file '{filename}'")
+    name = os.path.basename(filename)
     start = time.time()
-    r = requests.post(f"http://{peer_url}/fetch_file", json={"filename": os.path.basename(filename)})
+    r = SESSION.post(f"http://{peer_url}/fetch_file", data=_json_dumps({"filename": name}),
+                     headers=JSON_HEADERS)
     elapsed = time.time() - start
 
     if r.status_code == 200:
-        rebuilt_filename = os.path.join(f"data_peer2", f"rebuilt_{os.path.basename(filename)}")
+        rebuilt_filename = os.path.join(f"data_peer2", f"rebuilt_{name}")
         print(f"Download completed in {elapsed:.2f}s -> {rebuilt_filename}")
         return rebuilt_filename, elapsed
     else:
@@ -67,14 +61,22 @@ def download_file(peer_url, filename):
 def verify_integrity(local_original, local_rebuilt):
     print("\nIntegrity verification...")
     try:
-        h1 = hash_file(local_original)
-        h2 = hash_file(local_rebuilt)
-    except FileNotFoundError:
+        # A truncated download is caught by one stat, without hashing both files
+        size1, size2 = os.path.getsize(local_original), os.path.getsize(local_rebuilt)
+        if size1 != size2:
+            print(f"Files different! Size mismatch: original {size1} B, rebuilt {size2} B")
+            return False
+        # sha1 releases the GIL while hashing: both files are read and hashed at once
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            f1 = executor.submit(hash_file_cached, local_original)
+            f2 = executor.submit(hash_file, local_rebuilt)
+            h1, h2 = f1.result(), f2.result()
+    except (FileNotFoundError, TypeError):
         print(f"File not found for verification: {local_rebuilt}")
         return False
 
     if h1 == h2:
-        print(f"Verification OK -- identical files (SHA1: {h1})")
+        print(f"Verification OK -- identical files ({HASH_NAME}: {h1})")
         return True
     else:
         print(f"Files different!\n  Original: {h1}\n  Rebuilt: {h2}")
@@ -84,9 +86,9 @@ def verify_integrity(local_original, local_rebuilt):
 def search_file(peer_url, query_params):
     print(f"\n[SEARCH] on {peer_url} with query {query_params}")
     try:
-        r = requests.get(f"http://{peer_url}/search", params=query_params, timeout=5)
+        r = SESSION.get(f"http://{peer_url}/search", params=query_params, timeout=5)
         if r.status_code == 200:
-            results = r.json().get("results", [])
+            results = _json_loads(r.content).get("results", [])
             if results:
                 print(f"Found {len(results)} results:")
                 for res in results:
@@ -99,12 +101,26 @@ def search_file(peer_url, query_params):
         print(f"Error during search request: {e}")
 
 
+# peer_url -> (fetched_at, known_peers): back-to-back checks reuse a fresh answer
+KNOWN_PEERS_TTL = 1.0
+_known_peers_cache = {}
+
+def invalidate_known_peers():
+    """Drops cached answers (after a peer is stopped/started the view must be re-read)."""
+    _known_peers_cache.clear()
+
+
 def get_known_peers(peer_url):
     """Requests list of known peers from a node"""
+    cached = _known_peers_cache.get(peer_url)
+    if cached and time.monotonic() - cached[0] < KNOWN_PEERS_TTL:
+        print(f"{peer_url} knows: {cached[1]}")
+        return cached[1]
     try:
-        r = requests.get(f"http://{peer_url}/known_peers")
+        r = SESSION.get(f"http://{peer_url}/known_peers", timeout=5)
         if r.status_code == 200:
-            peers = r.json().get("known_peers", [])
+            peers = _json_loads(r.content).get("known_peers", [])
+            _known_peers_cache[peer_url] = (time.monotonic(), peers)
             print(f"{peer_url} knows: {peers}")
             return peers
         else:
@@ -115,32 +131,81 @@ def get_known_peers(peer_url):
         return []
 
 
+def get_known_peers_all(peer_urls):
+    """Queries known_peers on every node at once: {peer_url: peers}.
+    A dead node costs one timeout for the sweep, not one per node."""
+    with ThreadPoolExecutor(max_workers=len(peer_urls)) as executor:
+        return dict(zip(peer_urls, executor.map(get_known_peers, peer_urls)))
+
+
 def stop_peer(container_name):
-    """Stops a Docker container (simulates peer disconnection)"""
+    """Stops a Docker container (simulates peer disconnection).
+    Returns a wait(timeout) callable: callers poll the network meanwhile."""
     print(f"\nStopping {container_name}...")
-    subprocess.run(["docker", "stop", container_name])
-    time.sleep(3)
+    invalidate_known_peers()
+    return docker_async("stop", container_name)
 
 
 def start_peer(container_name):
-    """Restarts a Docker container (simulates peer return)"""
+    """Restarts a Docker container (simulates peer return).
+    Returns a wait(timeout) callable: callers poll the network meanwhile."""
     print(f"\nRestarting {container_name}...")
-    subprocess.run(["docker", "start", container_name])
-    time.sleep(5)
+    invalidate_known_peers()
+    return docker_async("start", container_name)
+
+def peer_sees(peer_url, target_peer):
+    """Quiet liveness probe: True if peer_url lists target_peer (short timeout, no printing)."""
+    try:
+        r = SESSION.get(f"http://{peer_url}/known_peers", timeout=1)
+        return r.status_code == 200 and target_peer in _json_loads(r.content).get("known_peers", [])
+    except Exception:
+        return False
 
 def wait_for_peer(peer_url, target_peer, timeout=60):
     """Waits until target_peer reappears in the known_peers list of peer_url."""
     print(f"Waiting for {target_peer} to be visible from {peer_url}...")
-    start = time.time()
-    while time.time() - start < timeout:
-        peers = get_known_peers(peer_url)
-        if target_peer in peers:
-            print(f"{target_peer} reappeared in network.")
-            return True
-        time.sleep(5)
+    if wait_until(lambda: peer_sees(peer_url, target_peer), timeout, interval=1):
+        print(f"{target_peer} reappeared in network.")
+        return True
     print(f"{target_peer} did not reappear within {timeout}s.")
     return False
 
+def wait_until(pred, timeout, interval=0.5):
+    """Polls pred() until it is true or timeout expires; returns as soon as it holds."""
+    deadline = time.monotonic() + timeout  # Immune to wall-clock adjustments
+    while time.monotonic() < deadline:
+        if pred():
+            return True
+        time.sleep(interval)
+    return False
+
+def _host_addr(peer_id):
+    """Container address in a manifest (peer3:5000) -> address published on the host (localhost:5003)."""
+    return f"localhost:{5000 + int(peer_id.split(':')[0][len('peer'):])}"
+
+def chunks_reachable(manifest):
+    """True once every chunk of manifest is held by at least one of the peers it lists,
+    i.e. the state the download actually depends on (asked per holder via /check_existence)."""
+    expected = {}
+    for ch in manifest["chunks"]:
+        for p in ch["peers"]:
+            expected.setdefault(p, []).append(ch["hash"])
+
+    def held(item):
+        peer_id, hashes = item
+        try:
+            r = SESSION.post(f"http://{_host_addr(peer_id)}/check_existence",
+                             data=_json_dumps({"chunks": hashes}), headers=JSON_HEADERS, timeout=2)
+            if r.status_code == 200:
+                return set(hashes) - set(_json_loads(r.content).get("missing_chunks", []))
+        except Exception:
+            pass
+        return set()
+
+    with ThreadPoolExecutor(max_workers=len(expected) or 1) as executor:
+        present = set().union(*executor.map(held, expected.items()))
+    return all(ch["hash"] in present for ch in manifest["chunks"])
+
 def check_peer_removed(peer_url, target_peer):
     peers = get_known_peers(peer_url)
     if target_peer not in peers:
@@ -163,40 +228,50 @@ def main():
         "anno": "2025",
         "genere": "Sci-Fi"
     }
-    manifest, upload_time = upload_file(PEERS[0], FILE_TO_UPLOAD, metadata)
+    # The network status check (step 4) does not depend on the upload:
+    # it runs while the upload is in flight, only the upload result gates step 2
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        upload = executor.submit(upload_file, PEERS[0], FILE_TO_UPLOAD, metadata)
+        status = executor.submit(get_known_peers_all, PEERS[:4])
+        manifest, upload_time = upload.result()
+        initial_status = status.result()
     if not manifest:
         print("Upload failed, test interrupted.")
         return
-    time.sleep(3)
-
-    # 2. Download and integrity
-    rebuilt_file, download_time = download_file(PEERS[1], FILE_TO_UPLOAD)
+    wait_until(lambda: chunks_reachable(manifest["manifest"]), 10)
+
+    # 2-3. Download (+ integrity) and distributed search are independent:
+    # run them side by side on different peers
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        download = executor.submit(download_file, PEERS[1], FILE_TO_UPLOAD)
+        search = executor.submit(search_file, PEERS[2], {"titolo": "La Trama dei Dati"})
+        rebuilt_file, download_time = download.result()
+        search.result()
     verify_integrity(FILE_TO_UPLOAD, rebuilt_file)
 
-    # 3. Distributed Search
-    search_file(PEERS[2], {"titolo": "La Trama dei Dati"})
-
-    # 4. Network status check
+    # 4. Network status check (collected during the upload)
     print("\nInitial network status:")
-    for p in PEERS[:4]:
-        get_known_peers(p)
+    for p, peers in initial_status.items():
+        print(f"  {p}: {peers}")
 
     # 5. Simulates peer disconnection
-    stop_peer("peer4")
-    time.sleep(20)
+    wait_stop = stop_peer("peer4")
+    # Until every node's failure detector has dropped peer4 (or 30s)
+    wait_until(lambda: all("peer4:5000" not in peers
+                           for peers in get_known_peers_all(PEERS[:4]).values()), 30, interval=1)
+    wait_stop(timeout=30)
 
     print("\nNetwork status after peer4 disconnection:")
     for p in PEERS[:4]:
         check_peer_removed(p, "peer4")
 
     # 6. Simulates peer4 restart
-    start_peer("peer4")
-    time.sleep(20)
+    wait_start = start_peer("peer4")
     wait_for_peer(PEERS[0], "peer4:5000")
+    wait_start(timeout=30)
 
     print("\nNetwork status after peer4 restart:")
-    for p in PEERS[:4]:
-        get_known_peers(p)
+    get_known_peers_all(PEERS[:4])
 
     # 7. Data availability test post-reentry
 
@@ -1,27 +1,27 @@
 #!/usr/bin/env python3
 import os
-import requests
-import hashlib
+import shutil
 import time
 import subprocess
 import random
 import string
+from concurrent.futures import ThreadPoolExecutor
+from _p2p_helpers import PEERS, SESSION, JSON_HEADERS, _json_dumps, _json_loads
+
+try:
+    import numpy as np
+    # Content only has to be unique per file: a userspace PRNG beats the kernel CSPRNG
+    _random_bytes = np.random.default_rng().bytes
+except ImportError:
+    _random_bytes = os.urandom
 
 # -------------------------------------------------------------------
 # CONFIGURATION
 # -------------------------------------------------------------------
-PEERS = [
-    "localhost:5001",
-    "localhost:5002",
-    "localhost:5003",
-    "localhost:5004",
-    "localhost:5005",
-    "localhost:5006",
-    "localhost:5007"
-]
-
 # Local directory where to create temporary dummy files
 TEST_DATA_DIR = "test_data_gen"
+# Dummy files are written in blocks of this size: peak memory stays flat for any size_mb
+DUMMY_WRITE_CHUNK = 4 * 1024 * 1024
 
 # -------------------------------------------------------------------
 # DUMMY FILE GENERATOR
@@ -38,14 +38,17 @@ def generate_dummy_file(filename, size_mb=1):
         return filepath
 
     print(f"Dummy file generation '{filename}' ({size_mb} MB)...")
+    remaining = int(size_mb * 1024 * 1024)
     with open(filepath, "wb") as f:
         # Writes random bytes
-        f.write(os.urandom(int(size_mb * 1024 * 1024)))
+        while remaining > 0:
+            n = min(DUMMY_WRITE_CHUNK, remaining)
+            f.write(_random_bytes(n))
+            remaining -= n
     return filepath
 
 def cleanup_test_data():
     """Removes temporary files at the end"""
-    import shutil
     if os.path.exists(TEST_DATA_DIR):
         shutil.rmtree(TEST_DATA_DIR)
         print("Temporary files cleanup completed.")
@@ -53,16 +56,21 @@ def cleanup_test_data():
 # -------------------------------------------------------------------
 # P2P INTERACTION FUNCTIONS
 # -------------------------------------------------------------------
-def hash_file(path):
-    sha = hashlib.sha1()
-    with open(path, "rb") as f:
-        while chunk := f.read(1024 * 1024):
-            sha.update(chunk)
-    return sha.hexdigest()
-
-def upload_file(peer_url, filepath, metadata=None):
+def _place_in_volume(src, dst):
+    """Puts src into a peer volume folder: a hardlink copies no bytes, a real copy is the fallback"""
+    if os.path.exists(dst):
+        if os.path.samefile(src, dst):
+            return
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy(src, dst)  # Cross-device or no hardlink support
+
+def upload_file(peer_url, filepath, metadata=None, out=print):
+    """Uploads filepath through peer_url and reports through out (see search_metadata)."""
     filename = os.path.basename(filepath)
-    print(f"[UPLOAD] Uploading '{filename}' to {peer_url}...")
+    out(f"[UPLOAD] Uploading '{filename}' to {peer_url}...")
     
     # Internal path to the container (simulated by mapping the folder or passing relative path)
     # Ensure the file is accessible to the container (e.g., via mounted volumes).
@@ -77,12 +85,10 @@ def upload_file(peer_url, filepath, metadata=None):
     # Assume 'data_peer1' folder corresponds to peer1 (localhost:5001)
     peer_idx = PEERS.index(peer_url) + 1
     local_mount_dir = f"data_peer{peer_idx}"
-    if not os.path.exists(local_mount_dir):
-        os.makedirs(local_mount_dir)
+    os.makedirs(local_mount_dir, exist_ok=True)  # Uploads may run concurrently
     
     # Copy generated file into peer volume folder
-    import shutil
-    shutil.copy(filepath, os.path.join(local_mount_dir, filename))
+    _place_in_volume(filepath, os.path.join(local_mount_dir, filename))
     
     start = time.time()
     payload = {"filename": internal_path}
@@ -90,43 +96,70 @@ def upload_file(peer_url, filepath, metadata=None):
         payload["metadata"] = metadata
     
     try:
-        r = requests.post(f"http://{peer_url}/store_file", json=payload)
+        r = SESSION.post(f"http://{peer_url}/store_file", data=_json_dumps(payload), headers=JSON_HEADERS)
         elapsed = time.time() - start
         if r.status_code == 200:
-            print(f"   OK ({elapsed:.2f}s)")
-            return r.json()
+            out(f"   OK ({elapsed:.2f}s)")
+            return _json_loads(r.content)
         else:
-            print(f"   Error: {r.status_code} - {r.text}")
+            out(f"   Error: {r.status_code} - {r.text}")
     except Exception as e:
-        print(f"   Exception: {e}")
+        out(f"   Exception: {e}")
     return None
 
-def search_metadata(peer_url, query, expected_count=None):
-    print(f"Query su {peer_url}: {query}")
+def upload_all(uploads):
+    """Runs the (peer_url, filepath, metadata) uploads in parallel; each one logs into
+    its own buffer, printed afterwards in submission order so the output stays readable."""
+    logs = [[] for _ in uploads]
+    with ThreadPoolExecutor(max_workers=len(uploads)) as executor:
+        futures = [executor.submit(upload_file, peer, path, meta, log.append)
+                   for (peer, path, meta), log in zip(uploads, logs)]
+        results = [f.result() for f in futures]
+    for log in logs:
+        print("\n".join(log))
+    return results
+
+def search_metadata(peer_url, query, expected_count=None, out=print):
+    """Runs a /search query and reports through out (pass a list's append to defer the output)."""
+    out(f"Query su {peer_url}: {query}")
     start = time.time()
     try:
-        r = requests.get(f"http://{peer_url}/search", params=query, timeout=5)
+        r = SESSION.get(f"http://{peer_url}/search", params=query, timeout=5)
         elapsed = time.time() - start
         
         if r.status_code == 200:
-            results = r.json().get("results", [])
+            results = _json_loads(r.content).get("results", [])
             count = len(results)
-            print(f"Found {count} results in {elapsed:.2f}s")
+            out(f"Found {count} results in {elapsed:.2f}s")
             for res in results:
-                print(f"- {res['filename']} (Host: {res.get('host', '?')})")
+                out(f"- {res['filename']} (Host: {res.get('host', '?')})")
             
             if expected_count is not None:
                 if count == expected_count:
-                    print(f"TARGET REACHED: Found exactly {expected_count} files.")
+                    out(f"TARGET REACHED: Found exactly {expected_count} files.")
                 else:
-                    print(f"WARNING: Expected {expected_count}, found {count}.")
+                    out(f"WARNING: Expected {expected_count}, found {count}.")
             return results
         else:
-            print(f"HTTP Error {r.status_code}")
+            out(f"HTTP Error {r.status_code}")
     except Exception as e:
-        print(f"Exception search: {e}")
+        out(f"Exception search: {e}")
     return []
 
+def wait_for_index(peer_url, expectations, timeout=5, interval=0.2):
+    """Polls /search on peer_url until every (query, count) pair is satisfied or timeout
+    expires: returns as soon as the indexes have propagated instead of after a fixed delay."""
+    quiet = lambda *_: None
+    start = time.monotonic()
+    while True:
+        if all(len(search_metadata(peer_url, q, out=quiet)) == n for q, n in expectations):
+            print(f"Indexes ready after {time.monotonic() - start:.2f}s")
+            return True
+        if time.monotonic() - start >= timeout:
+            print(f"Indexes not settled after {timeout}s, searching anyway")
+            return False
+        time.sleep(interval)
+
 # -------------------------------------------------------------------
 # TEST SCENARIOS
 # -------------------------------------------------------------------
@@ -142,7 +175,8 @@ def test_gsi_salting_stress():
     files_to_upload = 5
     uploaded_files = []
 
-    # 1. Generate and Upload 5 different files
+    # 1. Generate 5 different files, then upload them all at once
+    uploads = []
     for i in range(files_to_upload):
         fname = f"movie_brad_{i}.mp4"
         fpath = generate_dummy_file(fname, size_mb=0.1) # Small for speed
@@ -151,12 +185,14 @@ def test_gsi_salting_stress():
         target_peer = PEERS[i % len(PEERS)]
         
         meta = {"actor": popular_actor, "id": str(i)}
-        upload_file(target_peer, fpath, meta)
+        uploads.append((target_peer, fpath, meta))
         uploaded_files.append(fname)
-        time.sleep(0.5) # Short pause for log order
+
+    # Each upload waits on its own peer: run them side by side
+    upload_all(uploads)
 
     print("\nWaiting for index propagation (consistency delay)...")
-    time.sleep(2)
+    wait_for_index(PEERS[-1], [({"actor": popular_actor}, files_to_upload)])
 
     # 2. Search
     print("\nPerforming search for 'hotspot' actor...")
@@ -179,31 +215,44 @@ def test_multi_attribute_intersection():
     f2 = generate_dummy_file("john_wick.avi", 0.1)
     f3 = generate_dummy_file("notebook.avi", 0.1)
 
-    # Upload with specific metadata
-    # File 1: Keanu + Sci-Fi
-    upload_file(PEERS[0], f1, {"actor": "Keanu Reeves", "genre": "Sci-Fi"})
-    # File 2: Keanu + Action
-    upload_file(PEERS[1], f2, {"actor": "Keanu Reeves", "genre": "Action"})
-    # File 3: Ryan + Romance
-    upload_file(PEERS[2], f3, {"actor": "Ryan Gosling", "genre": "Romance"})
+    # Upload with specific metadata (in parallel, one peer each)
+    uploads = [
+        # File 1: Keanu + Sci-Fi
+        (PEERS[0], f1, {"actor": "Keanu Reeves", "genre": "Sci-Fi"}),
+        # File 2: Keanu + Action
+        (PEERS[1], f2, {"actor": "Keanu Reeves", "genre": "Action"}),
+        # File 3: Ryan + Romance
+        (PEERS[2], f3, {"actor": "Ryan Gosling", "genre": "Romance"}),
+    ]
+    upload_all(uploads)
     
-    time.sleep(2)
+    wait_for_index(PEERS[3], [({"actor": "Keanu Reeves"}, 2), ({"actor": "Ryan Gosling"}, 1)])
 
-    print("\n--- Case A: Single attribute search (Keanu) ---")
-    # We expect 2 files (Matrix and John Wick)
-    search_metadata(PEERS[3], {"actor": "Keanu Reeves"}, expected_count=2)
+    cases = [
+        # We expect 2 files (Matrix and John Wick)
+        ("Case A: Single attribute search (Keanu)", {"actor": "Keanu Reeves"}, 2),
+        # We expect only Matrix
+        ("Case B: Correct Intersection (Keanu AND Sci-Fi)", {"actor": "Keanu Reeves", "genre": "Sci-Fi"}, 1),
+        # We expect 0 results
+        ("Case C: Empty Intersection (Keanu AND Romance)", {"actor": "Keanu Reeves", "genre": "Romance"}, 0),
+    ]
 
-    print("\n--- Case B: Correct Intersection (Keanu AND Sci-Fi) ---")
-    # We expect only Matrix
-    res = search_metadata(PEERS[3], {"actor": "Keanu Reeves", "genre": "Sci-Fi"}, expected_count=1)
-    if res and os.path.basename(res[0]['filename']) == "matrix.avi":
-        print("   Exact match confirmed (Matrix).")
-    else:
-        print(f"   Incorrect match: {res}")
+    # The queries are independent: run them together, then report in case order
+    logs = [[] for _ in cases]
+    with ThreadPoolExecutor(max_workers=len(cases)) as executor:
+        futures = [executor.submit(search_metadata, PEERS[3], query, expected, log.append)
+                   for (_, query, expected), log in zip(cases, logs)]
+        results = [f.result() for f in futures]
 
-    print("\n--- Case C: Empty Intersection (Keanu AND Romance) ---")
-    # We expect 0 results
-    search_metadata(PEERS[3], {"actor": "Keanu Reeves", "genre": "Romance"}, expected_count=0)
+    for i, ((title, _, _), log) in enumerate(zip(cases, logs)):
+        print(f"\n--- {title} ---")
+        print("\n".join(log))
+        if i == 1:  # Case B must return exactly Matrix
+            res = results[1]
+            if res and os.path.basename(res[0]['filename']) == "matrix.avi":
+                print("   Exact match confirmed (Matrix).")
+            else:
+                print(f"   Incorrect match: {res}")
 
 
 def main():